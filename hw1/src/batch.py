@@ -0,0 +1,106 @@
+import argparse
+import itertools
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from . import dfa, nfa
+except ImportError: # run as a script from src
+    import dfa, nfa
+
+LOADERS = {"dfa": dfa.read_cfg, "nfa": nfa.read_cfg}
+
+# the automaton of the current process, loaded once by _load_automaton
+_automaton = None
+
+def _load_automaton(kind: str, path: str, cache: bool = False) -> bool:
+    global _automaton
+    _automaton = LOADERS[kind](path, cache)
+    return _automaton is not None
+
+def _evaluate(words: list[str]) -> list[bool]:
+    compiled = _automaton._compiled if _automaton._compiled is not None else _automaton.compile()
+    accepts = compiled.accepts
+    results = []
+    for word in words:
+        try:
+            results.append(accepts(word))
+        except ValueError: # a symbol outside the alphabet, the word is not in the language
+            results.append(False)
+    return results
+
+def _chunks(words, size: int):
+    words = iter(words)
+    while chunk := list(itertools.islice(words, size)):
+        yield chunk
+
+def process_words(kind: str, path: str, words, out, workers: int = 0, chunk_size: int = 10_000,
+                  cache: bool = False) -> dict:
+    """
+    Evaluates every word once and writes "accept\tword" or "reject\tword" lines to out,
+    in input order. With workers > 0 the chunks of words are sharded across a process pool
+    in which every worker loads the automaton once. With cache, read_cfg saves the compiled config
+    on the first load and the workers load it from there. Returns the run statistics, or None if
+    the config does not describe a valid automaton.
+    """
+    start = time.perf_counter()
+    if not _load_automaton(kind, path, cache):
+        return None
+    total = accepted = 0
+
+    def write(chunk: list[str], results: list[bool]) -> None:
+        nonlocal total, accepted
+        for word, result in zip(chunk, results):
+            out.write(f"{'accept' if result else 'reject'}\t{word}\n")
+        total += len(chunk)
+        accepted += sum(results)
+
+    if workers <= 0:
+        for chunk in _chunks(words, chunk_size):
+            write(chunk, _evaluate(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_load_automaton, initargs=(kind, path, cache)) as pool:
+            # bounded number of chunks in flight, so the input is never read all at once
+            pending = deque()
+            for chunk in _chunks(words, chunk_size):
+                pending.append((chunk, pool.submit(_evaluate, chunk)))
+                if len(pending) > 2 * workers:
+                    chunk, future = pending.popleft()
+                    write(chunk, future.result())
+            while pending:
+                chunk, future = pending.popleft()
+                write(chunk, future.result())
+
+    seconds = time.perf_counter() - start
+    return {
+        "words": total,
+        "accepted": accepted,
+        "seconds": seconds,
+        "words_per_second": total / seconds if seconds else 0.0,
+        "accept_ratio": accepted / total if total else 0.0,
+    }
+
+def main():
+    cli = argparse.ArgumentParser(description="Evaluate a list of words (one per line) on a DFA or NFA config.")
+    cli.add_argument("kind", choices=sorted(LOADERS))
+    cli.add_argument("config", help="path of the config file")
+    cli.add_argument("words", nargs="?", default="-", help="file with one word per line, - for stdin")
+    cli.add_argument("--workers", type=int, default=0, help="size of the process pool, 0 to run in this process")
+    cli.add_argument("--chunk-size", type=int, default=10_000)
+    cli.add_argument("--cache", action="store_true", help="save the compiled config next to it and reuse it")
+    args = cli.parse_args()
+
+    source = sys.stdin if args.words == "-" else open(args.words)
+    with source:
+        words = (line.rstrip("\n") for line in source)
+        stats = process_words(args.kind, args.config, words, sys.stdout, args.workers, args.chunk_size, args.cache)
+    if stats is None:
+        sys.exit(1)
+    print(f"{stats['words']} words in {stats['seconds']:.3f}s "
+          f"({stats['words_per_second']:.0f} words/s), "
+          f"accept ratio {stats['accept_ratio']:.2%}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import hashlib
+import marshal
+import os
+import tempfile
+
+# bump the version when the payloads written by dfa.py or nfa.py change shape
+MAGIC = b"LFA1"
+
+def cache_path(path: str) -> str:
+    return path + ".cache"
+
+def load_cache(path: str, kind: bytes) -> tuple[bytes, object]:
+    """
+    Hashes the config file at path and returns the digest together with the payload cached
+    next to it, or None as payload when there is no cache for this exact content.
+    kind (b"D" or b"N") keeps a DFA cache from being read as an NFA and the other way around.
+    """
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).digest()
+    try:
+        with open(cache_path(path), "rb") as f:
+            data = f.read()
+    except OSError:
+        return digest, None
+    header = MAGIC + kind + digest
+    if not data.startswith(header):
+        return digest, None
+    try:
+        return digest, marshal.loads(data[len(header):])
+    except (EOFError, ValueError, TypeError):
+        # truncated or written by another python version, parse the text again
+        return digest, None
+
+def store_cache(path: str, kind: bytes, digest: bytes, payload: object) -> None:
+    """
+    Writes the payload next to the config file. The file is replaced atomically, so other
+    processes loading the same config never read a half written cache.
+    A directory that is not writable just means no cache.
+    """
+    target = cache_path(path)
+    try:
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(target) or ".", suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + kind + digest + marshal.dumps(payload))
+        os.replace(temporary, target)
+    except OSError:
+        os.unlink(temporary)
@@ -1,6 +1,186 @@
 from collections import deque
+from array import array
+import codecs
+import mmap
 import os
 
+try:
+    from .cache import load_cache, store_cache
+except ImportError: # run as a script from src
+    from cache import load_cache, store_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class CompiledDFA:
+    """
+    Dense form of a DFA: states and symbols are numbered and the transition function
+    is a flat array with one row per state and one column per symbol, -1 being the dead state.
+    """
+    def __init__(self, dfa: "DFA"):
+        self.state_names = sorted(dfa.states)
+        index = {state: i for i, state in enumerate(self.state_names)}
+        self.symbols = {symbol: i for i, symbol in enumerate(sorted(dfa.alphabet))}
+        self.width = len(self.symbols)
+
+        self.table = array('i', [-1]) * (len(self.state_names) * self.width)
+        for state, row in dfa.transition.items():
+            base = index[state] * self.width
+            for symbol, following_state in row.items():
+                if symbol in self.symbols:
+                    self.table[base + self.symbols[symbol]] = index[following_state]
+
+        self.initial_state = index[dfa.initial_state]
+        self.final_states = bytearray(len(self.state_names))
+        for state in dfa.final_states:
+            self.final_states[index[state]] = 1
+        self._batch = None
+
+    def to_payload(self) -> tuple:
+        return (self.state_names, list(self.symbols), self.table.tobytes(),
+                self.initial_state, bytes(self.final_states))
+
+    @classmethod
+    def from_payload(cls, payload: tuple) -> "CompiledDFA":
+        compiled = cls.__new__(cls)
+        state_names, symbols, table, initial_state, final_states = payload
+        compiled.state_names = state_names
+        compiled.symbols = {symbol: i for i, symbol in enumerate(symbols)}
+        compiled.width = len(symbols)
+        compiled.table = array('i')
+        compiled.table.frombytes(table)
+        compiled.initial_state = initial_state
+        compiled.final_states = bytearray(final_states)
+        compiled._batch = None
+        return compiled
+
+    def run(self, current_state: int, string: str) -> int:
+        """
+        Reads string starting from current_state and returns the state reached, -1 being the dead state.
+        """
+        table, symbols, width = self.table, self.symbols, self.width
+        # the dead state has no way back, same as a missing transition
+        if current_state < 0:
+            return -1
+        for char in string:
+            column = symbols.get(char)
+            if column is None:
+                raise ValueError(f"The symbol {char} is not in the alphabet.")
+            current_state = table[current_state * width + column]
+            if current_state < 0:
+                return -1
+        return current_state
+
+    def accepts(self, string: str) -> bool:
+        current_state = self.run(self.initial_state, string)
+        return current_state >= 0 and self.final_states[current_state] == 1
+
+    def scanner(self) -> "Scanner":
+        return Scanner(self)
+
+    def accepts_batch(self, words) -> "np.ndarray":
+        """
+        Runs all the words in lock-step: an int32 vector with the state of every word is advanced
+        one position at a time, gathering the symbols of that position from the encoded batch.
+        The words are ordered by length, so the length mask freezing the words that already ended
+        is just the prefix of the vector that is still active.
+        """
+        if np is None:
+            raise RuntimeError("numpy not installed.")
+        words = list(words)
+        table, final_states, lookup = self._batch_table()
+        stride = self.width + 1
+
+        lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        columns = _encode_batch("".join(words), lookup)
+        order = np.argsort(-lengths, kind="stable")
+        starts = (np.cumsum(lengths) - lengths)[order]
+        longest = int(lengths[order[0]]) if len(words) else 0
+        # active[position] = number of words longer than position
+        active = np.searchsorted(-lengths[order], -np.arange(longest), side="left")
+
+        # the vector holds row offsets into the flat table, so a step is one gather per word
+        rows = np.full(len(words), self.initial_state * stride, dtype=np.int32)
+        for position, count in enumerate(active):
+            rows[:count] = table.take(rows[:count] + columns.take(starts[:count] + position))
+        current_states = np.empty_like(rows)
+        current_states[order] = rows
+        # a symbol outside the alphabet raises, as long as it was read before the dead state
+        errors = np.flatnonzero(current_states == (len(self.state_names) + 1) * stride)
+        if errors.size:
+            self.accepts(words[errors[0]])
+        return final_states[current_states // stride]
+
+    def _batch_table(self) -> tuple:
+        if self._batch is not None:
+            return self._batch
+        # two extra rows: the dead state, and the state reached after reading an unknown symbol
+        # (column width), from which the batch raises the same error as accepts
+        n_states, width = len(self.state_names), self.width
+        stride = width + 1
+        dead = n_states * stride
+        table = np.full((n_states + 2, stride), dead, dtype=np.int32)
+        targets = np.array(self.table, dtype=np.int32).reshape(n_states, width)
+        table[:n_states, :width] = np.where(targets < 0, dead, targets * stride)
+        error = dead + stride
+        table[:n_states, width] = error
+        table[n_states + 1, :] = error
+        final_states = np.zeros(n_states + 2, dtype=bool)
+        final_states[:n_states] = np.frombuffer(self.final_states, dtype=np.uint8) != 0
+        self._batch = (table.ravel(), final_states, _lookup_table(self.symbols, self.width))
+        return self._batch
+
+def _lookup_table(symbols: dict, width: int) -> "np.ndarray":
+    """
+    The column of every code point up to the largest one of the alphabet, width for the ones
+    outside it. Its last slot catches everything above the alphabet.
+    """
+    letters = {ord(symbol): column for symbol, column in symbols.items() if len(symbol) == 1}
+    size = max(letters, default=0) + 2
+    lookup = np.full(size, width, dtype=np.int32)
+    for code, column in letters.items():
+        lookup[code] = column
+    return lookup
+
+def _encode_batch(text: str, lookup: "np.ndarray") -> "np.ndarray":
+    """
+    Returns the column of every character of text, from the table of _lookup_table.
+    """
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    return lookup.take(np.minimum(codes, len(lookup) - 1))
+
+# Scanner, the file scans and the batch encoding have a twin in hw2/automata.py, keep them in step
+class Scanner:
+    """
+    A streaming scan over a compiled DFA: feed continues from the state reached by the previous
+    chunks, so a long input can be read piece by piece, and result tells whether everything fed
+    since the start (or the last reset) is accepted. The scan keeps its own state, so the DFA is
+    not changed and any number of scans of it can run at once.
+    """
+    __slots__ = ("compiled", "state")
+
+    def __init__(self, compiled: CompiledDFA):
+        self.compiled = compiled
+        self.state = compiled.initial_state
+
+    def reset(self) -> None:
+        self.state = self.compiled.initial_state
+
+    def feed(self, chunk: str) -> None:
+        self.state = self.compiled.run(self.state, chunk)
+
+    def dead(self) -> bool:
+        # nothing fed after the dead state can change the verdict
+        return self.state < 0
+
+    def result(self) -> bool:
+        """
+        Whether the input fed so far is accepted. It does not reset the scan.
+        """
+        return self.state >= 0 and self.compiled.final_states[self.state] == 1
+
 class DFA:
     def __init__(self, states: set, alphabet: set, transitions: dict, initial_state: str, final_states: set):
         self.states = states
@@ -8,6 +188,25 @@ class DFA:
         self.transition = transitions
         self.initial_state = initial_state
         self.final_states = final_states
+        self._compiled = None
+
+    @classmethod
+    def from_compiled(cls, compiled: CompiledDFA) -> "DFA":
+        """
+        Rebuilds the dictionary form from the table, keeping the table as the compiled form.
+        """
+        names, width = compiled.state_names, compiled.width
+        symbols = sorted(compiled.symbols, key=compiled.symbols.get)
+        transitions = {}
+        for i, state in enumerate(names):
+            row = compiled.table[i * width:(i + 1) * width]
+            following = {symbols[c]: names[target] for c, target in enumerate(row) if target >= 0}
+            if following:
+                transitions[state] = following
+        final_states = {names[i] for i, final in enumerate(compiled.final_states) if final}
+        dfa = cls(set(names), set(symbols), transitions, names[compiled.initial_state], final_states)
+        dfa._compiled = compiled
+        return dfa
 
     def has_accepting_path(self) -> bool: # BFS
         visited_states = set()
@@ -45,6 +244,78 @@ class DFA:
         # verifies if the dfa has reached a final state
         return current_state in self.final_states
 
+    def compile(self) -> CompiledDFA:
+        """
+        Builds the table used by accepts_many, accepts_batch and scanner, which build it on their
+        first call and then keep it. The table is a copy: after changing the states, alphabet or
+        transitions of the dfa, call compile again, or they keep matching the old automaton.
+        """
+        self._compiled = CompiledDFA(self)
+        return self._compiled
+
+    def accepts_many(self, words) -> list[bool]:
+        compiled = self._compiled if self._compiled is not None else self.compile()
+        accepts = compiled.accepts
+        return [accepts(word) for word in words]
+
+    def accepts_batch(self, words) -> "np.ndarray":
+        compiled = self._compiled if self._compiled is not None else self.compile()
+        return compiled.accepts_batch(words)
+
+    def scanner(self) -> "Scanner":
+        """
+        A new streaming scan of the input, see Scanner.
+        """
+        compiled = self._compiled if self._compiled is not None else self.compile()
+        return Scanner(compiled)
+
+def _read_windows(path: str, window: int):
+    """
+    Yields the text of the file at path window bytes at a time through a memory map, so the
+    file is never loaded into a single str. Characters split between windows are kept by
+    the incremental decoder until the next window.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with open(path, "rb") as f:
+        # mmap refuses empty files
+        if os.fstat(f.fileno()).st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for offset in range(0, len(mapped), window):
+                    yield decoder.decode(mapped[offset:offset + window])
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+def scan_file(dfa: DFA, path: str, window: int = 1 << 20) -> bool:
+    """
+    Whether the whole content of the file is accepted, using constant memory.
+    """
+    scanner = dfa.scanner()
+    for text in _read_windows(path, window):
+        scanner.feed(text)
+        if scanner.dead():
+            break
+    return scanner.result()
+
+def scan_file_lines(dfa: DFA, path: str, window: int = 1 << 20):
+    """
+    Yields the verdict for every line of the file (without the newline), using constant memory.
+    """
+    scanner = dfa.scanner()
+    pending = False
+    for text in _read_windows(path, window):
+        lines = text.split("\n")
+        scanner.feed(lines[0])
+        pending = pending or lines[0] != ""
+        for line in lines[1:]:
+            yield scanner.result()
+            scanner.reset()
+            scanner.feed(line)
+            pending = line != ""
+    # last line without a trailing newline
+    if pending:
+        yield scanner.result()
+
 def validate_dfa(states: set, alphabet: set, transitions: dict, initial_state: set, final_states: set) -> bool:
     errors = set()
     # condition 1: Functia de tranzitie sa aiba starile din multimea de stari declarata
@@ -83,8 +354,16 @@ def validate_dfa(states: set, alphabet: set, transitions: dict, initial_state: s
         return False
     return True
 
-def read_cfg(path: str) -> DFA:
+def read_cfg(path: str, cache: bool = False) -> DFA:
+    """
+    With cache=True, a valid config is also written in compiled form next to the file (see cache.py)
+    and later loads of the same content skip the parsing and the validation.
+    """
     try:
+        if cache:
+            digest, payload = load_cache(path, b"D")
+            if payload is not None:
+                return DFA.from_compiled(CompiledDFA.from_payload(payload))
         states = set()
         alphabet = set()
         transition = {}
@@ -141,7 +420,10 @@ def read_cfg(path: str) -> DFA:
                             transition[start][letter] = end
                         continue
         if validate_dfa(states, alphabet, transition, initial_state, final_states):
-            return DFA(states, alphabet, transition, initial_state.pop(), final_states)
+            dfa = DFA(states, alphabet, transition, initial_state.pop(), final_states)
+            if cache:
+                store_cache(path, b"D", digest, dfa.compile().to_payload())
+            return dfa
         else:
             return
     except FileNotFoundError:
@@ -154,15 +436,13 @@ def word_processor(dfa: DFA) -> None:
         if word == "exit":
             print("\033[93mExiting word processor.\033[0m")
             break
-        if dfa.accepts(word) and word != "":
-            print(f"\033[92mThe word {word} is accepted by the DFA.\033[0m")
-        elif word != "":
-            print(f"\033[91mThe word {word} is not accepted by the DFA.\033[0m")
-
-        if dfa.accepts(word) and word == "":
-            print(f"\033[92mThe word λ is accepted by the DFA.\033[0m")
-        elif word == "":
-            print(f"\033[91mThe word λ is not accepted by the DFA.\033[0m")
+        # evaluated once, the empty word is shown as λ
+        accepted = dfa.accepts(word)
+        shown = word if word != "" else "λ"
+        if accepted:
+            print(f"\033[92mThe word {shown} is accepted by the DFA.\033[0m")
+        else:
+            print(f"\033[91mThe word {shown} is not accepted by the DFA.\033[0m")
     return
 
 def main():
@@ -1,6 +1,81 @@
 from collections import deque
 import os
 
+try:
+    from .cache import load_cache, store_cache
+except ImportError: # run as a script from src
+    from cache import load_cache, store_cache
+
+class CompiledNFA:
+    """
+    Bitset form of an NFA: the states are numbered and a set of states is a single int
+    with bit i set for state i. For every symbol it keeps the successor mask of each state
+    and the mask of the states that have a transition on that symbol at all.
+    """
+    def __init__(self, nfa: "NFA"):
+        self.state_names = sorted(nfa.states)
+        index = {state: i for i, state in enumerate(self.state_names)}
+        # symbol -> (mask of states with a transition on symbol, successor mask of every state)
+        self.symbols = {symbol: [0, [0] * len(self.state_names)] for symbol in nfa.alphabet}
+        for state, row in nfa.transition.items():
+            for symbol, following_states in row.items():
+                if symbol not in self.symbols:
+                    continue
+                mask = 0
+                for following_state in following_states:
+                    mask |= 1 << index[following_state]
+                self.symbols[symbol][0] |= 1 << index[state]
+                self.symbols[symbol][1][index[state]] = mask
+
+        self.initial_state = 1 << index[nfa.initial_state]
+        self.final_states = 0
+        for state in nfa.final_states:
+            self.final_states |= 1 << index[state]
+
+    def to_payload(self) -> tuple:
+        # one successor mask per (state, symbol), row by row
+        symbols = sorted(self.symbols)
+        table = [self.symbols[symbol][1][i] for i in range(len(self.state_names)) for symbol in symbols]
+        return (self.state_names, symbols, table, self.initial_state, self.final_states)
+
+    @classmethod
+    def from_payload(cls, payload: tuple) -> "CompiledNFA":
+        compiled = cls.__new__(cls)
+        state_names, symbols, table, initial_state, final_states = payload
+        compiled.state_names = state_names
+        compiled.symbols = {}
+        width = len(symbols)
+        for c, symbol in enumerate(symbols):
+            successors = table[c::width] if width else []
+            sources = 0
+            for i, mask in enumerate(successors):
+                if mask:
+                    sources |= 1 << i
+            compiled.symbols[symbol] = [sources, successors]
+        compiled.initial_state = initial_state
+        compiled.final_states = final_states
+        return compiled
+
+    def step(self, current_states: int, char: str) -> int:
+        entry = self.symbols.get(char)
+        if entry is None:
+            raise ValueError(f"The symbol {char} is not in the alphabet.")
+        sources, successors = entry
+        active = current_states & sources
+        next_states = 0
+        while active:
+            lowest = active & -active
+            next_states |= successors[lowest.bit_length() - 1]
+            active ^= lowest
+        return next_states
+
+    def accepts(self, string: str) -> bool:
+        current_states = self.initial_state
+        step = self.step
+        for char in string:
+            current_states = step(current_states, char)
+        return current_states & self.final_states != 0
+
 class NFA:
     def __init__(self, states: set, alphabet: set, transitions: dict, initial_state: str, final_states: set):
         self.states = states
@@ -8,6 +83,26 @@ class NFA:
         self.transition = transitions
         self.initial_state = initial_state
         self.final_states = final_states
+        self._compiled = None
+
+    @classmethod
+    def from_compiled(cls, compiled: CompiledNFA) -> "NFA":
+        """
+        Rebuilds the dictionary form from the masks, keeping the masks as the compiled form.
+        """
+        names = compiled.state_names
+        def to_names(mask: int) -> set:
+            return {names[i] for i in range(mask.bit_length()) if mask >> i & 1}
+
+        transitions = {}
+        for symbol, (sources, successors) in compiled.symbols.items():
+            for i, mask in enumerate(successors):
+                if mask:
+                    transitions.setdefault(names[i], {})[symbol] = to_names(mask)
+        initial_state = names[compiled.initial_state.bit_length() - 1]
+        nfa = cls(set(names), set(compiled.symbols), transitions, initial_state, to_names(compiled.final_states))
+        nfa._compiled = compiled
+        return nfa
 
     def has_accepting_path(self) -> bool: # BFS
         visited_states = set()
@@ -51,6 +146,19 @@ class NFA:
                 return True
         return False
 
+    def compile(self) -> CompiledNFA:
+        """
+        Builds the bitset engine used by accepts_many, which builds it on its first call and then
+        keeps it. After changing the nfa, call compile again, or it keeps matching the old automaton.
+        """
+        self._compiled = CompiledNFA(self)
+        return self._compiled
+
+    def accepts_many(self, words) -> list[bool]:
+        compiled = self._compiled if self._compiled is not None else self.compile()
+        accepts = compiled.accepts
+        return [accepts(word) for word in words]
+
 def validate_nfa(states: set, alphabet: set, transitions: dict, initial_state: set, final_states: set) -> bool:
     errors = set()
     # condition 1: Functia de tranzitie sa aiba starile din multimea de stari declarata
@@ -90,8 +198,16 @@ def validate_nfa(states: set, alphabet: set, transitions: dict, initial_state: s
         return False
     return True
 
-def read_cfg(path: str) -> NFA:
+def read_cfg(path: str, cache: bool = False) -> NFA:
+    """
+    With cache=True, a valid config is also written in compiled form next to the file (see cache.py)
+    and later loads of the same content skip the parsing and the validation.
+    """
     try:
+        if cache:
+            digest, payload = load_cache(path, b"N")
+            if payload is not None:
+                return NFA.from_compiled(CompiledNFA.from_payload(payload))
         states = set()
         alphabet = set()
         transition = {}
@@ -150,7 +266,10 @@ def read_cfg(path: str) -> NFA:
                             transition[start][letter].add(end)
                         continue
         if validate_nfa(states, alphabet, transition, initial_state, final_states):
-            return NFA(states, alphabet, transition, initial_state.pop(), final_states)
+            nfa = NFA(states, alphabet, transition, initial_state.pop(), final_states)
+            if cache:
+                store_cache(path, b"N", digest, nfa.compile().to_payload())
+            return nfa
         else:
             return
     except FileNotFoundError:
@@ -163,15 +282,13 @@ def word_processor(nfa: NFA) -> None:
         if word == "exit":
             print("\033[93mExiting word processor.\033[0m")
             break
-        if nfa.accepts(word) and word != "":
-            print(f"\033[92mThe word {word} is accepted by the NFA.\033[0m")
-        elif word != "":
-            print(f"\033[91mThe word {word} is not accepted by the NFA.\033[0m")
-
-        if nfa.accepts(word) and word == "":
-            print(f"\033[92mThe word λ is accepted by the NFA.\033[0m")
-        elif word == "":
-            print(f"\033[91mThe word λ is not accepted by the NFA.\033[0m")
+        # evaluated once, the empty word is shown as λ
+        accepted = nfa.accepts(word)
+        shown = word if word != "" else "λ"
+        if accepted:
+            print(f"\033[92mThe word {shown} is accepted by the NFA.\033[0m")
+        else:
+            print(f"\033[91mThe word {shown} is not accepted by the NFA.\033[0m")
     return
 
 
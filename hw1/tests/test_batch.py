@@ -0,0 +1,36 @@
+import io
+from src.batch import process_words
+from src.dfa import read_cfg as read_dfa
+from src.nfa import read_cfg as read_nfa
+
+DFA_CFG = "./tests/dfa_cfg_files/2.txt"
+NFA_CFG = "./config/nfa_1.txt"
+
+def test_process_words_dfa():
+    words = ["ac", "abb", "a", "", "ax", "acaaaaaaaa"]
+    out = io.StringIO()
+    stats = process_words("dfa", DFA_CFG, iter(words), out, chunk_size=4)
+    dfa = read_dfa(DFA_CFG)
+    # "ax" has a symbol outside the alphabet and is rejected instead of stopping the run
+    expected = [dfa.accepts(word) for word in words[:4]] + [False, True]
+    assert out.getvalue().splitlines() == [
+        f"{'accept' if result else 'reject'}\t{word}" for word, result in zip(words, expected)
+    ]
+    assert stats["words"] == 6
+    assert stats["accepted"] == sum(expected)
+    assert stats["accept_ratio"] == sum(expected) / 6
+
+def test_process_words_nfa_pool():
+    nfa = read_nfa(NFA_CFG)
+    words = ["", "a", "ab", "bd", "acb", "adaca", "badd", "bb", "dd"] * 50
+    sequential, parallel = io.StringIO(), io.StringIO()
+    process_words("nfa", NFA_CFG, words, sequential)
+    stats = process_words("nfa", NFA_CFG, words, parallel, workers=2, chunk_size=7)
+    assert parallel.getvalue() == sequential.getvalue()
+    assert [line.split("\t")[0] == "accept" for line in parallel.getvalue().split("\n")[:-1]] == [
+        nfa.accepts(word) for word in words
+    ]
+    assert stats["words"] == len(words)
+
+def test_process_words_invalid_config():
+    assert process_words("dfa", "./tests/dfa_cfg_files/1.txt", ["a"], io.StringIO()) is None
@@ -1,4 +1,7 @@
-from src.dfa import DFA, validate_dfa, read_cfg
+from src.dfa import DFA, validate_dfa, read_cfg, scan_file, scan_file_lines
+from itertools import product
+import pytest
+import shutil
 import os
 
 def test_validity():
@@ -148,3 +151,146 @@ def test_read_cfg():
 
     assert read_cfg(os.path.join(base_path, "3.txt")) is None
     assert read_cfg(os.path.join(base_path, "4.txt")).has_accepting_path() == False
+
+def all_words(alphabet, max_length):
+    for length in range(max_length + 1):
+        for letters in product(sorted(alphabet), repeat=length):
+            yield "".join(letters)
+
+def test_compile():
+    dfa = DFA(
+        states={'q0', 'q1', 'q2', 'q3'},
+        alphabet={'a', 'b', 'c'},
+        transitions={
+            'q0': {'a': 'q1', 'b': 'q0'},
+            'q1': {'a': 'q1', 'b': 'q2'},
+            'q2': {'c': 'q2'}
+        },
+        initial_state='q0',
+        final_states={'q2'}
+    )
+    compiled = dfa.compile()
+    assert compiled.width == 3
+    assert len(compiled.table) == 4 * 3
+    # q3 has no transitions at all, so its whole row is dead
+    q3 = compiled.state_names.index('q3')
+    assert list(compiled.table[q3 * 3:(q3 + 1) * 3]) == [-1, -1, -1]
+    for word in all_words(dfa.alphabet, 6):
+        assert compiled.accepts(word) == dfa.accepts(word)
+
+def test_accepts_many():
+    base_path = "./tests/dfa_cfg_files/"
+    dfa = read_cfg(os.path.join(base_path, "2.txt"))
+    words = list(all_words(dfa.alphabet, 5))
+    assert dfa.accepts_many(words) == [dfa.accepts(word) for word in words]
+    assert dfa.accepts_many(iter(["ac", "abb", "a"])) == [True, True, False]
+    assert dfa.accepts_many([]) == []
+
+    with pytest.raises(ValueError, match="not in the alphabet"):
+        dfa.accepts_many(["ax"])
+
+def test_compile_after_changes():
+    dfa = DFA({"q0", "q1"}, {"a"}, {"q0": {"a": "q1"}}, "q0", {"q1"})
+    assert dfa.accepts_many(["a", "aa"]) == [True, False]
+    dfa.transition["q1"] = {"a": "q1"}
+    # the table is kept until compile is called again
+    assert dfa.accepts_many(["a", "aa"]) == [True, False]
+    dfa.compile()
+    assert dfa.accepts_many(["a", "aa"]) == [True, True]
+
+def test_accepts_batch():
+    pytest.importorskip("numpy")
+    base_path = "./tests/dfa_cfg_files/"
+    dfa = read_cfg(os.path.join(base_path, "2.txt"))
+    words = list(all_words(dfa.alphabet, 6))
+    assert list(dfa.accepts_batch(words)) == [dfa.accepts(word) for word in words]
+    assert len(dfa.accepts_batch([])) == 0
+    # the dead state is reached before the unknown symbol, so accepts would not raise either
+    assert list(dfa.accepts_batch(["ccx", "ac"])) == [False, True]
+
+    with pytest.raises(ValueError, match="not in the alphabet"):
+        dfa.accepts_batch(["ac", "ax"])
+    # the code point table is kept with the batch table
+    lookup = dfa._compiled._batch[2]
+    dfa.accepts_batch(words)
+    assert dfa._compiled._batch[2] is lookup
+
+def test_scanner():
+    base_path = "./tests/dfa_cfg_files/"
+    dfa = read_cfg(os.path.join(base_path, "2.txt"))
+    for word in all_words(dfa.alphabet, 5):
+        for split in range(len(word) + 1):
+            scanner = dfa.scanner()
+            scanner.feed(word[:split])
+            scanner.feed(word[split:])
+            assert scanner.result() == dfa.accepts(word)
+
+    scanner = dfa.scanner()
+    assert scanner.result() == dfa.accepts("")
+    # once dead, the rest of the input is not even read, like in accepts
+    scanner.feed("cc")
+    scanner.feed("x")
+    assert scanner.dead() and scanner.result() is False
+    scanner.reset()
+    with pytest.raises(ValueError, match="not in the alphabet"):
+        scanner.feed("ax")
+
+def test_scanners_are_independent():
+    base_path = "./tests/dfa_cfg_files/"
+    dfa = read_cfg(os.path.join(base_path, "2.txt"))
+    first, second = dfa.scanner(), dfa.scanner()
+    first.feed("ac")
+    second.feed("b")
+    # compiling again does not touch the scans already running
+    dfa.compile()
+    first.feed("aa")
+    assert first.result() is True and second.result() is False
+    assert dfa.scanner().result() == dfa.accepts("")
+
+def test_scan_file(tmp_path):
+    base_path = "./tests/dfa_cfg_files/"
+    dfa = read_cfg(os.path.join(base_path, "2.txt"))
+    path = tmp_path / "input.txt"
+    path.write_text("ac" + "a" * 8)
+    assert scan_file(dfa, str(path), window=3) is True
+    path.write_text("ac" + "a" * 9)
+    assert scan_file(dfa, str(path), window=3) is False
+    path.write_text("")
+    assert scan_file(dfa, str(path)) == dfa.accepts("")
+
+    lines = ["ac", "abb", "a", "", "acaaaaaaaa", "b"]
+    path.write_text("\n".join(lines) + "\n")
+    expected = [dfa.accepts(line) for line in lines]
+    for window in (1, 2, 5, 1 << 20):
+        assert list(scan_file_lines(dfa, str(path), window=window)) == expected
+    path.write_text("\n".join(lines))
+    assert list(scan_file_lines(dfa, str(path), window=4)) == expected
+
+def test_read_cfg_cache(tmp_path, capsys):
+    path = str(tmp_path / "2.txt")
+    shutil.copy("./tests/dfa_cfg_files/2.txt", path)
+    read_cfg(path)
+    assert not os.path.exists(path + ".cache") # only with cache=True
+    parsed = read_cfg(path, cache=True)
+    assert os.path.exists(path + ".cache")
+    cached = read_cfg(path, cache=True)
+    assert cached._compiled is not None
+    assert cached.states == parsed.states
+    assert cached.alphabet == parsed.alphabet
+    assert cached.transition == parsed.transition
+    assert cached.initial_state == parsed.initial_state
+    assert cached.final_states == parsed.final_states
+    words = list(all_words(parsed.alphabet, 5))
+    assert cached.accepts_many(words) == parsed.accepts_many(words)
+
+    # the cache is keyed by the content, an edited config is parsed again
+    with open(path) as f:
+        content = f.read()
+    with open(path, "w") as f:
+        f.write("# edited\n" + content)
+    assert read_cfg(path, cache=True).transition == parsed.transition
+    # invalid configs are never cached
+    shutil.copy("./tests/dfa_cfg_files/1.txt", path)
+    assert read_cfg(path, cache=True) is None
+    assert read_cfg(path, cache=True) is None
+    assert "does not create a valid DFA" in capsys.readouterr().out
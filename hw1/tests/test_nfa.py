@@ -1,4 +1,5 @@
 import pytest
+import shutil
 from src.nfa import NFA, validate_nfa, read_cfg
 import os
 
@@ -127,3 +128,48 @@ def test_nfa3():
     assert nfa.accepts("ab") is False
     assert nfa.has_accepting_path() is True
     assert validate_nfa(states, alphabet, transitions, {initial_state}, final_states)
+
+def test_compiled_nfa_matches_accepts():
+    from itertools import product
+    nfa = read_cfg("./config/nfa_1.txt")
+    compiled = nfa.compile()
+    for length in range(7):
+        for letters in product(sorted(nfa.alphabet), repeat=length):
+            word = "".join(letters)
+            assert compiled.accepts(word) == nfa.accepts(word)
+
+def test_compiled_nfa_masks():
+    compiled = nfa.compile()
+    q0, q1, q2 = (1 << compiled.state_names.index(state) for state in ("q0", "q1", "q2"))
+    assert compiled.initial_state == q0
+    assert compiled.final_states == q2
+    assert compiled.step(q0, "a") == q0 | q1
+    assert compiled.step(q0 | q1, "b") == q2
+    assert compiled.step(q2, "a") == 0
+
+def test_accepts_many():
+    assert nfa.accepts_many(["ab", "aaab", "bb", "", "aaba"]) == [True, True, False, False, False]
+    with pytest.raises(ValueError, match="not in the alphabet"):
+        nfa.accepts_many(["ab", "abc"])
+
+def test_read_cfg_cache(tmp_path):
+    path = str(tmp_path / "nfa_1.txt")
+    shutil.copy("./config/nfa_1.txt", path)
+    read_cfg(path)
+    assert not os.path.exists(path + ".cache") # only with cache=True
+    parsed = read_cfg(path, cache=True)
+    assert os.path.exists(path + ".cache")
+    cached = read_cfg(path, cache=True)
+    assert cached._compiled is not None
+    assert cached.states == parsed.states
+    assert cached.alphabet == parsed.alphabet
+    assert cached.transition == parsed.transition
+    assert cached.initial_state == parsed.initial_state
+    assert cached.final_states == parsed.final_states
+    words = ["", "a", "ab", "bd", "acb", "adaca", "badd"]
+    assert cached.accepts_many(words) == [parsed.accepts(word) for word in words]
+
+    # a cache from another format version is ignored
+    with open(path + ".cache", "r+b") as f:
+        f.write(b"XXXX")
+    assert read_cfg(path, cache=True).transition == parsed.transition
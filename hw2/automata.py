@@ -1,13 +1,316 @@
 from collections import deque
-from graphviz import Source, Digraph
+from array import array
+import codecs
+import mmap
+import os
+import io
+import struct
+import sys
+import tempfile
+from charclass import CharClass, RangeIndex, symbol_classes
+import dot
+import instrument
 
-def _dot_base(name: str = "automaton") -> "Digraph":
-    g = Digraph(name=name, format="png")
-    g.attr(rankdir="LR", fontsize="12", labelloc="t", fontname="Helvetica")
-    g.attr("node", fontname="Helvetica")
-    return g
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 LAMBDA = "λ"
+
+class CompiledDFA:
+    """
+    Dense form of a DFA: states and symbols are numbered and the transition function
+    is a flat array with one row per state and one column per symbol, -1 being the dead state.
+    A CharClass symbol is a whole equivalence class of characters, so it takes a single column.
+    columns maps characters to columns: the one-character symbols are there from the start and
+    the characters of CharClass symbols are added the first time column finds them.
+    """
+    def __init__(self, dfa: "DFA"):
+        self.state_names = sorted(dfa.states)
+        index = {state: i for i, state in enumerate(self.state_names)}
+        self.symbols = {symbol: i for i, symbol in enumerate(sorted(dfa.alphabet))}
+        self.width = len(self.symbols)
+        self.columns = {symbol: column for symbol, column in self.symbols.items() if isinstance(symbol, str)}
+        self._ranges = RangeIndex(self.symbols)
+
+        self.table = array('i', [-1]) * (len(self.state_names) * self.width)
+        for state, row in dfa.transition.items():
+            base = index[state] * self.width
+            for symbol, following_state in row.items():
+                if symbol in self.symbols:
+                    self.table[base + self.symbols[symbol]] = index[following_state]
+
+        self.initial_state = index[dfa.initial_state]
+        self.final_states = bytearray(len(self.state_names))
+        for state in dfa.final_states:
+            self.final_states[index[state]] = 1
+        self._batch = None
+
+    def column(self, char: str) -> int | None:
+        column = self.columns.get(char)
+        if column is None and self._ranges:
+            symbol = self._ranges.find(char)
+            if symbol is not None:
+                column = self.columns[char] = self.symbols[symbol]
+        return column
+
+    def run(self, current_state: int, string: str) -> int:
+        """
+        Reads string starting from current_state and returns the state reached, -1 being the dead state.
+        """
+        table, columns, width = self.table, self.columns, self.width
+        # the dead state has no way back, same as a missing transition
+        if current_state < 0:
+            return -1
+        for char in string:
+            column = columns.get(char)
+            if column is None:
+                column = self.column(char)
+                if column is None:
+                    return -1
+            current_state = table[current_state * width + column]
+            if current_state < 0:
+                return -1
+        return current_state
+
+    def accepts(self, string: str) -> bool:
+        current_state = self.run(self.initial_state, string)
+        return current_state >= 0 and self.final_states[current_state] == 1
+
+    def scanner(self) -> "Scanner":
+        return Scanner(self)
+
+    def accepts_batch(self, words) -> "np.ndarray":
+        """
+        Runs all the words in lock-step: an int32 vector with the state of every word is advanced
+        one position at a time, gathering the symbols of that position from the encoded batch.
+        The words are ordered by length, so the length mask freezing the words that already ended
+        is just the prefix of the vector that is still active.
+        """
+        if np is None:
+            raise RuntimeError("numpy not installed.")
+        words = list(words)
+        table, final_states, lookup = self._batch_table()
+        stride = self.width + 1
+
+        lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        columns = _encode_batch("".join(words), lookup)
+        order = np.argsort(-lengths, kind="stable")
+        starts = (np.cumsum(lengths) - lengths)[order]
+        longest = int(lengths[order[0]]) if len(words) else 0
+        # active[position] = number of words longer than position
+        active = np.searchsorted(-lengths[order], -np.arange(longest), side="left")
+
+        # the vector holds row offsets into the flat table, so a step is one gather per word
+        rows = np.full(len(words), self.initial_state * stride, dtype=np.int32)
+        for position, count in enumerate(active):
+            rows[:count] = table.take(rows[:count] + columns.take(starts[:count] + position))
+        current_states = np.empty_like(rows)
+        current_states[order] = rows
+        return final_states[current_states // stride]
+
+    def _batch_table(self) -> tuple:
+        if self._batch is not None:
+            return self._batch
+        # one extra row for the dead state and one extra column (width) for unknown symbols
+        n_states, width = len(self.state_names), self.width
+        stride = width + 1
+        dead = n_states * stride
+        table = np.full((n_states + 1, stride), dead, dtype=np.int32)
+        targets = np.array(self.table, dtype=np.int32).reshape(n_states, width)
+        table[:n_states, :width] = np.where(targets < 0, dead, targets * stride)
+        final_states = np.zeros(n_states + 1, dtype=bool)
+        final_states[:n_states] = self._final_mask()
+        self._batch = (table.ravel(), final_states, _lookup_table(self.symbols, self.width))
+        return self._batch
+
+    def _final_mask(self) -> "np.ndarray":
+        return np.frombuffer(self.final_states, dtype=np.uint8) != 0
+
+    def save(self, path: str) -> None:
+        """
+        Writes the table to a binary file that load_dfa maps back into memory, little-endian:
+            header        magic b"LFAD", version, number of states, width, initial state,
+                          number of symbol entries (uint32 each)
+            symbol map    (lo, hi, column) int32 triples, one per range of code points of a symbol
+            table         states * width int32, the same flat table, -1 being the dead state
+            accepting     one bit per state, bit i % 8 of byte i // 8
+        The file is written to a temporary name and renamed, so a reader never sees half of it.
+        """
+        entries = sorted((lo, hi, column) for symbol, column in self.symbols.items()
+                         for lo, hi in (symbol.ranges if isinstance(symbol, CharClass) else [(ord(symbol), ord(symbol))]))
+        table = array('i', self.table)
+        if sys.byteorder == "big":
+            table.byteswap()
+        accepting = bytearray((len(self.final_states) + 7) // 8)
+        for state, final in enumerate(self.final_states):
+            if final:
+                accepting[state >> 3] |= 1 << (state & 7)
+
+        directory = os.path.dirname(path) or "."
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, len(self.final_states), self.width,
+                                     self.initial_state, len(entries)))
+                for entry in entries:
+                    f.write(_ENTRY.pack(*entry))
+                f.write(table.tobytes())
+                f.write(accepting)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+_MAGIC = b"LFAD"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4s5I")
+_ENTRY = struct.Struct("<3i")
+
+class _Bitmap:
+    """
+    Read-only view of the accepting bitmap of a mapped DFA, indexed like CompiledDFA.final_states.
+    """
+    __slots__ = ("bits", "size")
+
+    def __init__(self, bits, size: int):
+        self.bits = bits
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, state: int) -> int:
+        return (self.bits[state >> 3] >> (state & 7)) & 1
+
+class MappedDFA(CompiledDFA):
+    """
+    A CompiledDFA read from a file written by save, matching straight on a read-only memory map:
+    the table is a memoryview of the mapped pages and the accepting states a bitmap over them,
+    so loading costs the mmap call and the symbol map, and processes mapping the same file share
+    one copy in the page cache. State names are not stored, state_names are the numbers.
+    Close it (or use it in a with statement) to unmap the file.
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._load(path)
+        except BaseException:
+            self._map.close()
+            raise
+
+    def _load(self, path: str) -> None:
+        # the slices kept below stay valid once this view is released
+        with memoryview(self._map) as view:
+            if len(view) < _HEADER.size:
+                raise ValueError(f"{path} is not a DFA file.")
+            magic, version, n_states, width, initial_state, n_entries = _HEADER.unpack_from(view)
+            if magic != _MAGIC or version != _FORMAT_VERSION:
+                raise ValueError(f"{path} is not a DFA file of version {_FORMAT_VERSION}.")
+            table_start = _HEADER.size + n_entries * _ENTRY.size
+            bits_start = table_start + 4 * n_states * width
+            if len(view) != bits_start + (n_states + 7) // 8:
+                raise ValueError(f"{path} is truncated or corrupt.")
+
+            ranges: dict[int, list] = {}
+            for lo, hi, column in _ENTRY.iter_unpack(view[_HEADER.size:table_start]):
+                ranges.setdefault(column, []).append((lo, hi))
+            self.symbols = {(chr(spans[0][0]) if len(spans) == 1 and spans[0][0] == spans[0][1] else CharClass(spans)): column
+                            for column, spans in ranges.items()}
+            self.width = width
+            self.columns = {symbol: column for symbol, column in self.symbols.items() if isinstance(symbol, str)}
+            self._ranges = RangeIndex(self.symbols)
+
+            if sys.byteorder == "big": # the file is little-endian, only then is the table copied
+                self.table = array('i')
+                self.table.frombytes(view[table_start:bits_start])
+                self.table.byteswap()
+            else:
+                self.table = view[table_start:bits_start].cast('i')
+            self.final_states = _Bitmap(view[bits_start:], n_states)
+            self.state_names = range(n_states)
+            self.initial_state = initial_state
+            self._batch = None
+
+    def _final_mask(self) -> "np.ndarray":
+        bits = np.frombuffer(self.final_states.bits, dtype=np.uint8)
+        return np.unpackbits(bits, bitorder="little")[:len(self.final_states)] != 0
+
+    def close(self) -> None:
+        # the views must be released before the map can be closed
+        self._batch = None
+        for view in (self.table, self.final_states.bits):
+            if isinstance(view, memoryview):
+                view.release()
+        self._map.close()
+
+    def __enter__(self) -> "MappedDFA":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def load_dfa(path: str) -> MappedDFA:
+    """
+    Maps a DFA saved with DFA.save (or CompiledDFA.save) and returns it ready to match.
+    """
+    return MappedDFA(path)
+
+def _lookup_table(symbols: dict, width: int) -> "np.ndarray":
+    """
+    The column of every code point up to the largest one of the alphabet, width for the ones
+    outside it. Its last slot catches everything above the alphabet.
+    """
+    letters = {ord(symbol): column for symbol, column in symbols.items() if isinstance(symbol, str)}
+    ranges = [(lo, hi, column) for symbol, column in symbols.items() if isinstance(symbol, CharClass)
+              for lo, hi in symbol.ranges]
+    size = max(max(letters, default=0), max((hi for _, hi, _ in ranges), default=0)) + 2
+    lookup = np.full(size, width, dtype=np.int32)
+    for lo, hi, column in ranges:
+        lookup[lo:hi + 1] = column
+    for code, column in letters.items():
+        lookup[code] = column
+    return lookup
+
+def _encode_batch(text: str, lookup: "np.ndarray") -> "np.ndarray":
+    """
+    Returns the column of every character of text, from the table of _lookup_table.
+    """
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    return lookup.take(np.minimum(codes, len(lookup) - 1))
+
+# Scanner, the file scans and the batch encoding have a twin in hw1/src/dfa.py, keep them in step
+class Scanner:
+    """
+    A streaming scan over a compiled DFA: feed continues from the state reached by the previous
+    chunks, so a long input can be read piece by piece, and result tells whether everything fed
+    since the start (or the last reset) is accepted. The scan keeps its own state, so the DFA is
+    not changed and any number of scans of it can run at once.
+    """
+    __slots__ = ("compiled", "state")
+
+    def __init__(self, compiled: CompiledDFA):
+        self.compiled = compiled
+        self.state = compiled.initial_state
+
+    def reset(self) -> None:
+        self.state = self.compiled.initial_state
+
+    def feed(self, chunk: str) -> None:
+        self.state = self.compiled.run(self.state, chunk)
+
+    def dead(self) -> bool:
+        # nothing fed after the dead state can change the verdict
+        return self.state < 0
+
+    def result(self) -> bool:
+        """
+        Whether the input fed so far is accepted. It does not reset the scan.
+        """
+        return self.state >= 0 and self.compiled.final_states[self.state] == 1
+
 class DFA:
     def __init__(self, states: set, alphabet: set, transitions: dict, initial_state: str, final_states: set):
         self.states = states
@@ -15,6 +318,8 @@ class DFA:
         self.transition = transitions
         self.initial_state = initial_state
         self.final_states = final_states
+        self._compiled = None
+        self._ranges = RangeIndex(alphabet)
 
     def has_accepting_path(self) -> bool: # BFS
         visited_states = set()
@@ -41,7 +346,8 @@ class DFA:
     def accepts(self, string: str) -> bool:
         current_state = self.initial_state
         for char in string:
-            if char not in self.alphabet:
+            char = self.symbol_class(char)
+            if char is None:
                 return False
             # no transition available for the current state
             if current_state not in self.transition:
@@ -52,27 +358,123 @@ class DFA:
         # verifies if the dfa has reached a final state
         return current_state in self.final_states
 
-    def to_dot(self) -> str:
-        if Digraph is None:
-            raise RuntimeError("python-graphviz not installed.")
-        g = _dot_base("DFA")
-        g.node("start", shape="point")
-        g.edge("start", self.initial_state, label="")
-        for state in self.states:
-            shape = "doublecircle" if state in self.final_states else "circle"
-            g.node(state, shape=shape)
-        for src, adict in self.transition.items():
-            grouped: dict[str, list[str]] = {}
-            for sym, dst in adict.items():
-                grouped.setdefault(dst, []).append(sym)
-            for dst, syms in grouped.items():
-                g.edge(src, dst, label=",".join(sorted(syms)))
-        return g.source
-
-    def render(self, path: str, format: str = "png") -> None:
-        if Digraph is None:
-            raise RuntimeError("python-graphviz not installed.")
-        Source(self.to_dot(), filename=path, format=format).render(cleanup=True)
+    def symbol_class(self, char: str) -> str | CharClass | None:
+        """
+        The symbol of the alphabet that char belongs to: char itself or the CharClass containing it,
+        None if char is outside the alphabet.
+        """
+        if char in self.alphabet:
+            return char
+        return self._ranges.find(char) if self._ranges else None
+
+    def compile(self) -> CompiledDFA:
+        self._compiled = CompiledDFA(self)
+        return self._compiled
+
+    def accepts_many(self, words) -> list[bool]:
+        compiled = self._compiled if self._compiled is not None else self.compile()
+        accepts = compiled.accepts
+        return [accepts(word) for word in words]
+
+    def accepts_batch(self, words) -> "np.ndarray":
+        compiled = self._compiled if self._compiled is not None else self.compile()
+        return compiled.accepts_batch(words)
+
+    def save(self, path: str) -> None:
+        """
+        Saves the compiled table to a binary file, see CompiledDFA.save and load_dfa.
+        """
+        compiled = self._compiled if self._compiled is not None else self.compile()
+        compiled.save(path)
+
+    def scanner(self) -> "Scanner":
+        """
+        A new streaming scan of the input, see Scanner.
+        """
+        compiled = self._compiled if self._compiled is not None else self.compile()
+        return Scanner(compiled)
+
+    def to_dot(self, max_states: int | None = None) -> str:
+        out = io.StringIO()
+        dot.write_dot(self, out, "DFA", max_states)
+        return out.getvalue()
+
+    def render(self, path: str, format: str = "png", max_states: int | None = None) -> str:
+        return dot.render(self, path, format, "DFA", max_states)
+
+class CompiledNFA:
+    """
+    Bitset form of a λ-NFA: the states are numbered and a set of states is a single int
+    with bit i set for state i. For every symbol it keeps the mask of the states that have
+    a transition on it and, for each of them, the λ-closure of its successors, so a step
+    never has to compute a closure. CharClass labels are split into disjoint symbol classes first,
+    so a character always has a single entry.
+    """
+    def __init__(self, nfa: "NFA"):
+        self.state_names, self.closures = nfa.lambda_closure_masks()
+        index = {state: i for i, state in enumerate(self.state_names)}
+
+        # symbol -> (mask of states with a transition on symbol, closed successor mask of every state)
+        self.symbols: dict[str, tuple[int, list[int]]] = {}
+        labels = {symbol for row in nfa.transition.values() for symbol in row if symbol != LAMBDA}
+        cover = None
+        if any(isinstance(label, CharClass) for label in labels):
+            _, cover = symbol_classes(labels)
+        for state, row in nfa.transition.items():
+            for label, following_states in row.items():
+                if label == LAMBDA:
+                    continue
+                for symbol in (cover[label] if cover else (label,)):
+                    sources, successors = self.symbols.setdefault(symbol, (0, [0] * len(self.state_names)))
+                    mask = successors[index[state]]
+                    for following_state in following_states:
+                        mask |= self.closures[index[following_state]]
+                    successors[index[state]] = mask
+                    self.symbols[symbol] = (sources | 1 << index[state], successors)
+        self._ranges = RangeIndex(self.symbols)
+
+        self.initial_state = self.closures[index[nfa.initial_state]]
+        self.final_states = 0
+        for state in nfa.final_states:
+            self.final_states |= 1 << index[state]
+
+    def symbol_class(self, char: str) -> str | CharClass | None:
+        """
+        The symbol that char belongs to: char itself or the symbol class containing it,
+        None if no transition reads char.
+        """
+        if char in self.symbols:
+            return char
+        return self._ranges.find(char) if self._ranges else None
+
+    def step(self, current_states: int, char: str) -> int:
+        """
+        The closed set of states reached from current_states by char, which may also be a symbol
+        returned by symbol_class.
+        """
+        entry = self.symbols.get(char)
+        if entry is None:
+            symbol = self._ranges.find(char) if self._ranges else None
+            if symbol is None:
+                return 0
+            entry = self.symbols[symbol]
+        sources, successors = entry
+        active = current_states & sources
+        next_states = 0
+        while active:
+            lowest = active & -active
+            next_states |= successors[lowest.bit_length() - 1]
+            active ^= lowest
+        return next_states
+
+    def accepts(self, string: str) -> bool:
+        current_states = self.initial_state
+        step = self.step
+        for char in string:
+            current_states = step(current_states, char)
+            if not current_states:
+                return False
+        return current_states & self.final_states != 0
 
 class NFA:
     def __init__(self, states: set, alphabet: set, transitions: dict, initial_state: str, final_states: set):
@@ -81,78 +483,216 @@ class NFA:
         self.transition = transitions
         self.initial_state = initial_state
         self.final_states = final_states
+        self._compiled = None
+        self._closure_masks = None
+        self._closures = None
+        self._classes = [symbol for symbol in alphabet if isinstance(symbol, CharClass)]
+
+    def lambda_closure_masks(self) -> tuple[list[str], list[int]]:
+        """
+        The sorted states and the λ-closure of every one of them as a bitmask over that order,
+        computed once and kept on the NFA (so the transitions should not change afterwards).
+        """
+        if self._closure_masks is None:
+            self._closure_masks = _lambda_closure_masks(self)
+        return self._closure_masks
+
+    def lambda_closures(self) -> dict[str, frozenset[str]]:
+        """
+        The λ-closure of every state as a set of names, built from the masks the first time it is needed.
+        """
+        if self._closures is None:
+            names, masks = self.lambda_closure_masks()
+            # the states of a λ-cycle share their closure, and so its set
+            sets: dict[int, frozenset[str]] = {}
+            self._closures = {}
+            for state, mask in zip(names, masks):
+                closure = sets.get(mask)
+                if closure is None:
+                    members, rest = [], mask
+                    while rest:
+                        lowest = rest & -rest
+                        members.append(names[lowest.bit_length() - 1])
+                        rest ^= lowest
+                    closure = sets[mask] = frozenset(members)
+                self._closures[state] = closure
+        return self._closures
+
+    def lambda_closure(self, states) -> set[str]:
+        # the closure of a set is the union of the closures of its states
+        closures = self.lambda_closures()
+        closure = set()
+        for state in states:
+            closure |= closures[state]
+        return closure
 
     def has_accepting_path(self) -> bool: # BFS
+        closures = self.lambda_closures()
         visited_states = set()
 
         queue = deque([self.initial_state])
 
         while queue:
             current_state = queue.popleft()
-            if current_state in self.final_states:
-                return True
             if current_state in visited_states:
                 continue
-            visited_states.add(current_state)
+            # everything reachable through λ is visited at once
+            closure = closures[current_state]
+            if closure & self.final_states:
+                return True
+            visited_states |= closure
 
-            for letter in self.alphabet:
-                if current_state not in self.transition:
-                    continue
-                if letter not in self.transition[current_state]:
-                    continue
-                following_states = self.transition[current_state][letter]
-                for state in following_states:
-                    if state not in visited_states:
-                        queue.append(state)
+            for state in closure:
+                for letter, following_states in self.transition.get(state, {}).items():
+                    if letter == LAMBDA:
+                        continue
+                    for following_state in following_states:
+                        if following_state not in visited_states:
+                            queue.append(following_state)
         return False
 
     def accepts(self, string: str) -> bool:
-        def lambda_closure(states: set) -> set:
-            closure = set(states)
-            stack = list(states)
-            while stack:
-                state = stack.pop()
-                if state in self.transition:
-                    if LAMBDA in self.transition[state]:
-                        for next_state in self.transition[state][LAMBDA]:
-                            if next_state not in closure:
-                                closure.add(next_state)
-                                stack.append(next_state)
-            return closure
-
-        current_states = lambda_closure({self.initial_state})
+        current_states = self.lambda_closure({self.initial_state})
 
         for char in string:
+            # the character itself and every class label containing it
+            labels = [char] + [label for label in self._classes if char in label]
             next_states = set()
             for state in current_states:
-                if state in self.transition and char in self.transition[state]:
-                    next_states.update(self.transition[state][char])
-            current_states = lambda_closure(next_states)
+                if state not in self.transition:
+                    continue
+                for label in labels:
+                    if label in self.transition[state]:
+                        next_states.update(self.transition[state][label])
+            current_states = self.lambda_closure(next_states)
 
         for state in current_states:
             if state in self.final_states:
                 return True
         return False
 
-    def to_dot(self) -> str:
-        if Digraph is None:
-            raise RuntimeError("python-graphviz not installed.")
-        g = _dot_base("NFA")
-        g.node("start", shape="point")
-        g.edge("start", self.initial_state, label="")
-        for state in self.states:
-            shape = "doublecircle" if state in self.final_states else "circle"
-            g.node(state, shape=shape)
-        for src, adict in self.transition.items():
-            grouped: dict[frozenset[str], list[str]] = {}
-            for sym, dst_set in adict.items():
-                for dst in dst_set:
-                    grouped.setdefault((dst,), []).append(sym)
-            for (dst,), syms in grouped.items():
-                g.edge(src, dst, label=",".join(sorted(syms)))
-        return g.source
-
-    def render(self, path: str, format: str = "png") -> None:
-        if Digraph is None:
-            raise RuntimeError("python-graphviz not installed.")
-        Source(self.to_dot(), filename=path, format=format).render(cleanup=True)
\ No newline at end of file
+    def compile(self) -> CompiledNFA:
+        self._compiled = CompiledNFA(self)
+        return self._compiled
+
+    def accepts_many(self, words) -> list[bool]:
+        compiled = self._compiled if self._compiled is not None else self.compile()
+        accepts = compiled.accepts
+        return [accepts(word) for word in words]
+
+    def to_dot(self, max_states: int | None = None) -> str:
+        out = io.StringIO()
+        dot.write_dot(self, out, "NFA", max_states)
+        return out.getvalue()
+
+    def render(self, path: str, format: str = "png", max_states: int | None = None) -> str:
+        return dot.render(self, path, format, "NFA", max_states)
+
+def _lambda_closure_masks(nfa: NFA) -> tuple[list[str], list[int]]:
+    """
+    Computes all the λ-closures as bitmasks over the sorted states, in linear time plus the
+    unions of the masks. λ-cycles, made by * and +, are strongly connected components whose
+    states share one closure, so the λ-graph is condensed with Tarjan's algorithm. Tarjan finishes
+    a component only after all the components it reaches, so their closures are already known
+    and the closure of the component is its own states plus theirs.
+    """
+    names = sorted(set(nfa.states) | set(nfa.transition) | {nfa.initial_state})
+    position = {state: i for i, state in enumerate(names)}
+    edges = [[position[target] for target in nfa.transition.get(state, {}).get(LAMBDA, ())] for state in names]
+    masks = [0] * len(names)
+    index = [-1] * len(names)
+    low = [0] * len(names)
+    stack: list[int] = []
+    on_stack = bytearray(len(names))
+    counter = 0
+
+    for root in range(len(names)):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        work = [(root, iter(edges[root]))] # explicit stack instead of recursion
+        while work:
+            state, pending = work[-1]
+            for following in pending:
+                if index[following] < 0:
+                    index[following] = low[following] = counter
+                    counter += 1
+                    stack.append(following)
+                    on_stack[following] = 1
+                    work.append((following, iter(edges[following])))
+                    break
+                if on_stack[following]:
+                    low[state] = min(low[state], index[following])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[state])
+                if low[state] == index[state]:
+                    component = []
+                    closure = 0
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component.append(member)
+                        closure |= 1 << member
+                        if member == state:
+                            break
+                    for member in component:
+                        for following in edges[member]:
+                            # the closures of the other components are done, the own one is still 0
+                            closure |= masks[following]
+                    for member in component:
+                        masks[member] = closure
+    instrument.count("closures", len(names))
+    return names, masks
+
+def _read_windows(path: str, window: int):
+    """
+    Yields the text of the file at path window bytes at a time through a memory map, so the
+    file is never loaded into a single str. Characters split between windows are kept by
+    the incremental decoder until the next window.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with open(path, "rb") as f:
+        # mmap refuses empty files
+        if os.fstat(f.fileno()).st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for offset in range(0, len(mapped), window):
+                    yield decoder.decode(mapped[offset:offset + window])
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+def scan_file(dfa: DFA, path: str, window: int = 1 << 20) -> bool:
+    """
+    Whether the whole content of the file is accepted, using constant memory.
+    """
+    scanner = dfa.scanner()
+    for text in _read_windows(path, window):
+        scanner.feed(text)
+        if scanner.dead():
+            break
+    return scanner.result()
+
+def scan_file_lines(dfa: DFA, path: str, window: int = 1 << 20):
+    """
+    Yields the verdict for every line of the file (without the newline), using constant memory.
+    """
+    scanner = dfa.scanner()
+    pending = False
+    for text in _read_windows(path, window):
+        lines = text.split("\n")
+        scanner.feed(lines[0])
+        pending = pending or lines[0] != ""
+        for line in lines[1:]:
+            yield scanner.result()
+            scanner.reset()
+            scanner.feed(line)
+            pending = line != ""
+    # last line without a trailing newline
+    if pending:
+        yield scanner.result()
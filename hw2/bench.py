@@ -0,0 +1,293 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from parser import to_postfix
+from thompson import postfix_to_nfa
+from glushkov import postfix_to_glushkov
+from derivatives import postfix_to_dfa
+from subset import nfa_to_dfa
+from minimise import minimise_dfa
+from lazy import LazyDFA
+from automata import LAMBDA
+from charclass import CharClass
+import codegen
+
+def _timed(fn, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+def _letters(alphabet) -> str:
+    # one character per symbol, the first one of every range for the classes
+    return "".join(sorted(chr(symbol.ranges[0][0]) if isinstance(symbol, CharClass) else symbol
+                          for symbol in alphabet if symbol != LAMBDA))
+
+def _random_words(alphabet: str, count: int, max_length: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length))) for _ in range(count)]
+
+def bench_batch(args) -> None:
+    """
+    Compares the scalar accepts loop against the compiled table and the numpy lock-step batch.
+    """
+    dfa = minimise_dfa(nfa_to_dfa(postfix_to_nfa(to_postfix(args.regex))))
+    words = _random_words(_letters(dfa.alphabet), args.words, args.length, args.seed)
+    print(f"regex={args.regex!r} states={len(dfa.states)} words={len(words)} max_length={args.length}")
+
+    scalar, expected = _timed(lambda: [dfa.accepts(word) for word in words])
+    table, many = _timed(dfa.accepts_many, words)
+    assert many == expected
+    results = [("accepts", scalar), ("accepts_many", table)]
+    try:
+        dfa.accepts_batch(words[:1]) # builds the numpy table outside the measurement
+        batch, vector = _timed(dfa.accepts_batch, words)
+        assert vector.tolist() == expected
+        results.append(("accepts_batch", batch))
+    except RuntimeError as e:
+        print(f"skipping accepts_batch: {e}")
+
+    for name, seconds in results:
+        print(f"  {name:14} {seconds:8.3f}s {len(words) / seconds:12.0f} words/s {scalar / seconds:6.1f}x")
+
+def bench_nfa(args) -> None:
+    """
+    Compares the set based NFA.accepts against the bitset engine on a Thompson NFA.
+    """
+    nfa = postfix_to_nfa(to_postfix(args.regex))
+    words = _random_words(_letters(nfa.alphabet), args.words, args.length, args.seed)
+    print(f"regex={args.regex!r} nfa_states={len(nfa.states)} words={len(words)} max_length={args.length}")
+
+    compile_time, _ = _timed(nfa.compile)
+    sets, expected = _timed(lambda: [nfa.accepts(word) for word in words])
+    bits, many = _timed(nfa.accepts_many, words)
+    assert many == expected
+    print(f"  compile        {compile_time:8.3f}s")
+    for name, seconds in (("accepts", sets), ("accepts_many", bits)):
+        print(f"  {name:14} {seconds:8.3f}s {len(words) / seconds:12.0f} words/s {sets / seconds:6.1f}x")
+
+def bench_lazy(args) -> None:
+    """
+    Lazy determinisation against the bitset NFA and, when it is small enough, the full DFA.
+    """
+    nfa = postfix_to_nfa(to_postfix(args.regex))
+    words = _random_words(_letters(nfa.alphabet), args.words, args.length, args.seed)
+    print(f"regex={args.regex!r} nfa_states={len(nfa.states)} words={len(words)} max_length={args.length}")
+
+    simulation, expected = _timed(nfa.accepts_many, words)
+    lazy = LazyDFA(nfa, max_states=args.max_states)
+    lazy_time, results = _timed(lazy.accepts_many, words)
+    assert results == expected
+    print(f"  bitset nfa     {simulation:8.3f}s")
+    print(f"  lazy dfa       {lazy_time:8.3f}s {simulation / lazy_time:6.1f}x {lazy.stats()}")
+    if args.full:
+        build, dfa = _timed(nfa_to_dfa, nfa)
+        match, results = _timed(dfa.accepts_many, words)
+        assert results == expected
+        print(f"  full dfa       {build + match:8.3f}s (construction {build:.3f}s, {len(dfa.states)} states)")
+
+def bench_construction(args) -> None:
+    """
+    Thompson against Glushkov: size of the NFA, λ-transitions and the time of nfa_to_dfa.
+    Then the DFA of both, and of the derivatives, until minimised.
+    """
+    postfix = to_postfix(args.regex)
+    literals = sum(1 for token in postfix if token not in {'.', '|', '*', '+', '?'})
+    print(f"regex={args.regex!r} literals={literals}")
+    for name, construction in (("thompson", postfix_to_nfa), ("glushkov", postfix_to_glushkov)):
+        build, nfa = _timed(construction, postfix)
+        edges = sum(len(targets) for row in nfa.transition.values() for targets in row.values())
+        lambdas = sum(len(row.get(LAMBDA, ())) for row in nfa.transition.values())
+        determinise, dfa = _timed(nfa_to_dfa, nfa)
+        print(f"  {name:11} states={len(nfa.states):6} edges={edges:7} λ-edges={lambdas:6} "
+              f"build={build:.4f}s nfa_to_dfa={determinise:.4f}s dfa_states={len(dfa.states)}")
+        minimise, minimal = _timed(minimise_dfa, dfa)
+        print(f"  {'':11} to minimal DFA {build + determinise + minimise:.4f}s ({len(minimal.states)} states)")
+    derive, dfa = _timed(postfix_to_dfa, postfix)
+    minimise, minimal = _timed(minimise_dfa, dfa)
+    print(f"  {'derivatives':11} dfa_states={len(dfa.states)} build={derive:.4f}s")
+    print(f"  {'':11} to minimal DFA {derive + minimise:.4f}s ({len(minimal.states)} states)")
+
+def bench_subset(args) -> None:
+    """
+    Sequential subset construction against the parallel frontier mode with args.workers processes.
+    """
+    nfa = postfix_to_nfa(to_postfix(args.regex))
+    print(f"regex={args.regex!r} nfa_states={len(nfa.states)} workers={args.workers}")
+    sequential, expected = _timed(nfa_to_dfa, nfa)
+    parallel, dfa = _timed(lambda: nfa_to_dfa(nfa, workers=args.workers))
+    assert dfa.transition == expected.transition and dfa.final_states == expected.final_states
+    print(f"  sequential     {sequential:8.3f}s ({len(dfa.states)} states)")
+    print(f"  parallel       {parallel:8.3f}s {sequential / parallel:6.1f}x")
+
+def bench_codegen(args) -> None:
+    """
+    Compares the dict-driven DFA.accepts and the compiled table against the generated matcher.
+    """
+    dfa = minimise_dfa(nfa_to_dfa(postfix_to_nfa(to_postfix(args.regex))))
+    words = _random_words(_letters(dfa.alphabet), args.words, args.length, args.seed)
+    print(f"regex={args.regex!r} states={len(dfa.states)} words={len(words)} max_length={args.length}")
+    generate, match = _timed(codegen.matcher, dfa, None)
+    print(f"  generated and compiled in {generate * 1000:.1f} ms")
+
+    compiled = dfa.compile()
+    scalar, expected = _timed(lambda: [dfa.accepts(word) for word in words])
+    results = [("dict", scalar)]
+    for name, accepts in [("table", compiled.accepts), ("codegen", match)]:
+        seconds, verdicts = _timed(lambda: [accepts(word) for word in words])
+        assert verdicts == expected
+        results.append((name, seconds))
+    for name, seconds in results:
+        print(f"  {name:14} {seconds:8.3f}s {len(words) / seconds:12.0f} words/s {scalar / seconds:6.1f}x")
+
+def _literal(n: int, rng: random.Random) -> str:
+    return "".join(rng.choice("abcd") for _ in range(n))
+
+def _nesting(n: int, rng: random.Random) -> str:
+    # (a(b(c...)?)?)? with n levels
+    letters = [rng.choice("abcd") for _ in range(n)]
+    return "".join("(" + letter for letter in letters) + ")?" * n
+
+def _alternation(n: int, rng: random.Random) -> str:
+    words = {_literal(8, rng) for _ in range(n)}
+    while len(words) < n:
+        words.add(_literal(8, rng))
+    return "|".join(sorted(words))
+
+def _exponential(n: int, rng: random.Random) -> str:
+    # (a|b)*a(a|b){n}, the parser has no counted repetition
+    return "(a|b)*a" + "(a|b)" * n
+
+# family -> (regex generator, default sizes)
+FAMILIES = {
+    "literal": (_literal, [100, 1000, 5000]),
+    "nesting": (_nesting, [10, 100, 500]),
+    "alternation": (_alternation, [10, 100, 1000]),
+    "exponential": (_exponential, [4, 8, 12]),
+}
+
+def _stages(regex: str) -> tuple[dict, object]:
+    """
+    Times every stage of the pipeline on regex. Returns the record and the minimal DFA.
+    """
+    seconds = {}
+    seconds["to_postfix"], postfix = _timed(to_postfix, regex)
+    seconds["postfix_to_nfa"], nfa = _timed(postfix_to_nfa, postfix)
+    seconds["nfa_to_dfa"], dfa = _timed(nfa_to_dfa, nfa)
+    seconds["minimise_dfa"], minimal = _timed(minimise_dfa, dfa)
+    record = {
+        "regex_length": len(regex),
+        "seconds": seconds,
+        "nfa_states": len(nfa.states),
+        "dfa_states": len(dfa.states),
+        "minimal_states": len(minimal.states),
+    }
+    return record, minimal
+
+def _matching(dfa, words: list[str]) -> dict:
+    scalar, expected = _timed(lambda: [dfa.accepts(word) for word in words])
+    dfa.compile()
+    table, results = _timed(dfa.accepts_many, words)
+    assert results == expected
+    return {
+        "words": len(words),
+        "characters": sum(map(len, words)),
+        "accepts_seconds": scalar,
+        "accepts_many_seconds": table,
+        "words_per_second": len(words) / table if table else 0.0,
+        "accept_ratio": sum(expected) / len(words) if words else 0.0,
+    }
+
+def _sample_words(dfa, count: int, max_length: int, rng: random.Random) -> list[str]:
+    """
+    Words of the language of dfa: random walks from the initial state, cut at the last final state seen.
+    """
+    words = []
+    transitions = {state: sorted(row.items()) for state, row in dfa.transition.items()}
+    for _ in range(count):
+        state, word, accepted = dfa.initial_state, [], ""
+        for _ in range(max_length):
+            if state in dfa.final_states:
+                accepted = "".join(word)
+            if state not in transitions:
+                break
+            symbol, state = rng.choice(transitions[state])
+            word.append(chr(symbol.ranges[0][0]) if isinstance(symbol, CharClass) else symbol)
+        else:
+            if state in dfa.final_states:
+                accepted = "".join(word)
+        words.append(accepted)
+    return words
+
+def bench_suite(args) -> None:
+    """
+    Every stage of the pipeline and the matching throughput on the generated families of regexes.
+    Each corpus is made of random words over the alphabet of the regex and of words sampled from the
+    language itself (by a random walk on the minimal DFA), so both outcomes are exercised.
+    The results, with the state counts, are printed and written as JSON to args.output.
+    """
+    families = args.family or sorted(FAMILIES)
+    results = []
+    for family in families:
+        generator, sizes = FAMILIES[family]
+        for n in args.sizes or sizes:
+            rng = random.Random(args.seed)
+            regex = generator(n, rng)
+            record, minimal = _stages(regex)
+            words = _random_words(_letters(minimal.alphabet), args.words // 2, args.length, args.seed)
+            words += _sample_words(minimal, args.words - len(words), args.length, rng)
+            record.update(family=family, n=n, matching=_matching(minimal, words))
+            results.append(record)
+
+            stages = " ".join(f"{stage}={seconds:.4f}s" for stage, seconds in record["seconds"].items())
+            print(f"{family:11} n={n:<5} nfa={record['nfa_states']:<6} dfa={record['dfa_states']:<6} "
+                  f"min={record['minimal_states']:<6} {stages} "
+                  f"match={record['matching']['words_per_second']:.0f} words/s")
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "words": args.words,
+        "length": args.length,
+        "seed": args.seed,
+        "results": results,
+    }
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}")
+
+BENCHMARKS = {
+    "batch": bench_batch,
+    "nfa": bench_nfa,
+    "lazy": bench_lazy,
+    "construction": bench_construction,
+    "subset": bench_subset,
+    "codegen": bench_codegen,
+    "suite": bench_suite,
+}
+
+def main():
+    cli = argparse.ArgumentParser(description="Benchmarks for the regex pipeline.")
+    cli.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    cli.add_argument("--regex", default="(a|b)*a(a|b)(a|b)(a|b)")
+    cli.add_argument("--words", type=int, default=100_000)
+    cli.add_argument("--length", type=int, default=32)
+    cli.add_argument("--seed", type=int, default=0)
+    cli.add_argument("--max-states", type=int, default=10_000, help="cache bound of the lazy DFA")
+    cli.add_argument("--full", action="store_true", help="also build the full DFA with nfa_to_dfa")
+    cli.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes of the parallel subset construction")
+    cli.add_argument("--family", action="append", choices=sorted(FAMILIES), help="suite: family to run, can be repeated")
+    cli.add_argument("--sizes", type=int, nargs="+", help="suite: sizes n instead of the defaults of the family")
+    cli.add_argument("--output", help="suite: JSON file for the results, - for stdout")
+    args = cli.parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+from bisect import bisect_left, bisect_right
+
+__all__ = ["CharClass", "RangeIndex", "MAX_CODE_POINT", "disjoint_atoms", "symbol_classes"]
+
+MAX_CODE_POINT = 0x10FFFF
+
+def _show(code: int) -> str:
+    char = chr(code)
+    if char in "]\\^-":
+        return "\\" + char
+    if char.isprintable():
+        return char
+    if char in "\n\t\r":
+        return {"\n": "\\n", "\t": "\\t", "\r": "\\r"}[char]
+    if code > 0xFFFF:
+        return f"\\U{code:08x}"
+    return f"\\u{code:04x}" if code > 0xFF else f"\\x{code:02x}"
+
+class CharClass:
+    """
+    A set of characters used as a single NFA/DFA symbol, stored as sorted, disjoint and
+    non-adjacent ranges (lo, hi) of code points, both ends included.
+    Classes compare with plain one-character symbols by their first code point, so a mixed
+    alphabet of disjoint symbols can still be sorted.
+    """
+    __slots__ = ("ranges",)
+
+    def __init__(self, ranges, negated: bool = False):
+        merged: list[tuple[int, int]] = []
+        for lo, hi in sorted(ranges):
+            if merged and lo <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(hi, merged[-1][1]))
+            else:
+                merged.append((lo, hi))
+        if negated:
+            complement, lo = [], 0
+            for start, end in merged:
+                if start > lo:
+                    complement.append((lo, start - 1))
+                lo = end + 1
+            if lo <= MAX_CODE_POINT:
+                complement.append((lo, MAX_CODE_POINT))
+            merged = complement
+        self.ranges = tuple(merged)
+
+    def __contains__(self, char: str) -> bool:
+        code = ord(char)
+        k = bisect_right(self.ranges, (code, MAX_CODE_POINT)) - 1
+        return k >= 0 and code <= self.ranges[k][1]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, CharClass):
+            return self.ranges == other.ranges
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.ranges)
+
+    def _first(self) -> int:
+        return self.ranges[0][0] if self.ranges else -1
+
+    @staticmethod
+    def _key(symbol) -> int:
+        return symbol._first() if isinstance(symbol, CharClass) else ord(symbol)
+
+    def __lt__(self, other) -> bool:
+        return self._first() < self._key(other)
+
+    def __gt__(self, other) -> bool:
+        return self._first() > self._key(other)
+
+    def __le__(self, other) -> bool:
+        return self._first() <= self._key(other)
+
+    def __ge__(self, other) -> bool:
+        return self._first() >= self._key(other)
+
+    def __str__(self) -> str:
+        ranges, prefix = self.ranges, ""
+        # classes like . or [^a] are easier to read negated
+        if ranges and ranges[0][0] == 0 and ranges[-1][1] == MAX_CODE_POINT:
+            ranges, prefix = CharClass(ranges, negated=True).ranges, "^"
+        parts = [_show(lo) if lo == hi else f"{_show(lo)}-{_show(hi)}" for lo, hi in ranges]
+        return f"[{prefix}{''.join(parts)}]"
+
+    def __repr__(self) -> str:
+        return f"CharClass({self})"
+
+def _ranges(symbol) -> tuple:
+    if isinstance(symbol, CharClass):
+        return symbol.ranges
+    return ((ord(symbol), ord(symbol)),)
+
+def disjoint_atoms(labels) -> tuple[list, dict]:
+    """
+    Splits overlapping symbols (characters and classes) into the disjoint intervals of characters
+    that no label tells apart. An atom of one character is the character itself, a wider one a
+    CharClass with a single range. Returns the sorted atoms and the atoms covered by every label.
+    """
+    labels = set(labels)
+    delta: dict[int, int] = {}
+    for label in labels:
+        for lo, hi in _ranges(label):
+            delta[lo] = delta.get(lo, 0) + 1
+            delta[hi + 1] = delta.get(hi + 1, 0) - 1
+    boundaries = sorted(delta)
+
+    atoms, starts, depth = [], [], 0
+    for lo, end in zip(boundaries, boundaries[1:]):
+        depth += delta[lo]
+        if depth:
+            atoms.append(chr(lo) if lo == end - 1 else CharClass([(lo, end - 1)]))
+            starts.append(lo)
+
+    cover: dict = {}
+    for label in labels:
+        members = []
+        for lo, hi in _ranges(label):
+            k = bisect_left(starts, lo)
+            while k < len(starts) and starts[k] <= hi:
+                members.append(atoms[k])
+                k += 1
+        cover[label] = members
+    return atoms, cover
+
+def symbol_classes(labels) -> tuple[list, dict]:
+    """
+    Groups the atoms of disjoint_atoms into equivalence classes: atoms covered by exactly the same
+    labels are taken on the same transitions everywhere, so the automaton never tells them apart.
+    A class is the character itself when it holds a single character, otherwise the CharClass of
+    all its atoms (e.g. the pieces of \\W between the letters and digits).
+    Returns the sorted classes and the classes covered by every label.
+    """
+    atoms, cover = disjoint_atoms(labels)
+    signature: dict = {atom: [] for atom in atoms}
+    for label, members in cover.items():
+        for atom in members:
+            signature[atom].append(label)
+    groups: dict = {}
+    for atom in atoms:
+        groups.setdefault(frozenset(signature[atom]), []).append(atom)
+
+    class_of = {}
+    for members in groups.values():
+        if len(members) == 1:
+            symbol = members[0]
+        else:
+            symbol = CharClass([lo_hi for atom in members for lo_hi in _ranges(atom)])
+        for atom in members:
+            class_of[atom] = symbol
+    classes = sorted(set(class_of.values()))
+    class_cover = {label: list(dict.fromkeys(class_of[atom] for atom in members)) for label, members in cover.items()}
+    return classes, class_cover
+
+class RangeIndex:
+    """
+    Finds which CharClass of a set of disjoint symbols contains a character, by bisection on the
+    starts of all their ranges. Plain one-character symbols are left to a dict lookup by the caller.
+    """
+    def __init__(self, symbols):
+        entries = sorted(((lo, hi), symbol) for symbol in symbols if isinstance(symbol, CharClass)
+                         for lo, hi in symbol.ranges)
+        self.starts = [lo for (lo, _), _ in entries]
+        self.ends = [hi for (_, hi), _ in entries]
+        self.symbols = [symbol for _, symbol in entries]
+
+    def __bool__(self) -> bool:
+        return bool(self.starts)
+
+    def find(self, char: str):
+        code = ord(char)
+        k = bisect_right(self.starts, code) - 1
+        if k >= 0 and code <= self.ends[k]:
+            return self.symbols[k]
+        return None
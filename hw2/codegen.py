@@ -0,0 +1,180 @@
+import hashlib
+import importlib.util
+import os
+import tempfile
+from collections import deque
+from automata import DFA
+from charclass import CharClass
+from compiler import cache_directory, private_directory
+
+__all__ = ["generate", "matcher", "CODEGEN_VERSION", "MAX_STATES"]
+
+# bump when the generated code changes, so the modules cached on disk are not reused
+CODEGEN_VERSION = 2
+# past a few hundred states the binary search on the state costs more than the table lookups
+MAX_STATES = 256
+
+def _default_directory() -> str:
+    return os.path.join(cache_directory(), "codegen")
+
+def _number(dfa: DFA) -> list[str]:
+    # BFS from the initial state, so it is state 0 and the unreachable states are left out
+    order = [dfa.initial_state]
+    seen = {dfa.initial_state}
+    queue = deque(order)
+    while queue:
+        state = queue.popleft()
+        for symbol in sorted(dfa.transition.get(state, {})):
+            following = dfa.transition[state][symbol]
+            if following not in seen:
+                seen.add(following)
+                order.append(following)
+                queue.append(following)
+    return order
+
+def _table(dfa: DFA) -> tuple[list, list[int]]:
+    """
+    The DFA with numbered states: for every state its (code point ranges, target) pairs, the
+    most used first, and the final states. The pieces of a class split by symbol_classes are
+    joined back (like a-z around c and m), so equal DFAs give equal tables whatever their symbols.
+    """
+    order = _number(dfa)
+    if len(order) > MAX_STATES:
+        raise ValueError(f"The DFA has {len(order)} states, more than {MAX_STATES}.")
+    number = {state: i for i, state in enumerate(order)}
+    rows = []
+    for state in order:
+        grouped: dict[int, list] = {}
+        for symbol, following in dfa.transition.get(state, {}).items():
+            if symbol in dfa.alphabet:
+                grouped.setdefault(number[following], []).extend(
+                    symbol.ranges if isinstance(symbol, CharClass) else [(ord(symbol), ord(symbol))])
+        row = [(CharClass(ranges).ranges, target) for target, ranges in grouped.items()]
+        row.sort(key=lambda item: (-sum(hi - lo + 1 for lo, hi in item[0]), item[1]))
+        rows.append(row)
+    finals = sorted(number[state] for state in dfa.final_states if state in number)
+    return rows, finals
+
+def _condition(ranges: tuple) -> str:
+    """
+    A test of the variable char for a set of code point ranges: == or in for the single
+    characters, chained comparisons for the longer ranges.
+    """
+    singles, tests = [], []
+    for lo, hi in ranges:
+        if lo == hi:
+            singles.append(chr(lo))
+        else:
+            tests.append(f"{chr(lo)!r} <= char <= {chr(hi)!r}")
+    if len(singles) == 1:
+        tests.insert(0, f"char == {singles[0]!r}")
+    elif singles:
+        tests.insert(0, f"char in {''.join(singles)!r}")
+    return " or ".join(tests)
+
+def _state_code(rows: list, state: int, indent: str) -> list[str]:
+    lines = []
+    keyword = "if"
+    for ranges, target in rows[state]:
+        lines.append(f"{indent}{keyword} {_condition(ranges)}:")
+        lines.append(f"{indent}    state = {target}" if target != state else f"{indent}    pass")
+        keyword = "elif"
+    if lines:
+        lines.append(f"{indent}else:")
+        lines.append(f"{indent}    return False")
+    else:
+        lines.append(f"{indent}return False")
+    return lines
+
+def _dispatch(rows: list, lo: int, hi: int, indent: str) -> list[str]:
+    # binary search on the state number, so a step costs O(log n) comparisons and not n
+    if lo == hi:
+        return _state_code(rows, lo, indent)
+    middle = (lo + hi) // 2
+    return ([f"{indent}if state <= {middle}:"] + _dispatch(rows, lo, middle, indent + "    ")
+            + [f"{indent}else:"] + _dispatch(rows, middle + 1, hi, indent + "    "))
+
+def _source(rows: list, finals: list[int], name: str) -> str:
+    lines = [
+        f"# generated by codegen.py version {CODEGEN_VERSION}, do not edit",
+        "",
+        f"FINALS = frozenset({finals!r})",
+        "",
+        f"def {name}(string):",
+        "    state = 0",
+        "    for char in string:",
+    ]
+    lines += _dispatch(rows, 0, len(rows) - 1, "        ")
+    lines.append("    return state in FINALS")
+    return "\n".join(lines) + "\n"
+
+def generate(dfa: DFA, name: str = "match") -> str:
+    """
+    Python source of a module defining name(string) -> bool, a matcher for dfa with the
+    transitions written out as code: a loop over the characters with one branch per state,
+    picked by a binary search on the state number, each branch testing the character with
+    plain comparisons. Unreachable states are left out.
+    """
+    return _source(*_table(dfa), name)
+
+_loaded: dict[str, object] = {}
+
+def matcher(dfa: DFA, directory: str | None = "", name: str = "match"):
+    """
+    The generated matcher of dfa, compiled once per process. The cache key is the sha256 of the
+    numbered table of the DFA, so the source is only generated on a miss. It is saved in directory
+    (by default codegen/ in the cache directory of compiler.py, None keeps nothing on disk) and
+    imported from there, so Python caches its bytecode next to it and the next process only loads
+    the .pyc. Like the DFA cache, the directory is only used if no other user can write into it.
+    """
+    rows, finals = _table(dfa)
+    digest = hashlib.sha256(repr((CODEGEN_VERSION, name, rows, finals)).encode("utf-8")).hexdigest()[:32]
+    function = _loaded.get(digest)
+    if function is not None:
+        return function
+
+    if directory == "":
+        directory = _default_directory()
+    module = None
+    if directory is not None and private_directory(directory):
+        module = _import(directory, f"lfa_match_{digest}", lambda: _source(rows, finals, name))
+    if module is None:
+        namespace: dict = {}
+        exec(compile(_source(rows, finals, name), f"<codegen {digest}>", "exec"), namespace)
+        function = namespace[name]
+    else:
+        function = getattr(module, name)
+    _loaded[digest] = function
+    return function
+
+def _trusted(path: str) -> bool:
+    # a file of the user that nobody else can change
+    info = os.stat(path)
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        return False
+    return info.st_mode & 0o022 == 0
+
+def _import(directory: str, module_name: str, source):
+    path = os.path.join(directory, module_name + ".py")
+    if not os.path.exists(path):
+        try:
+            fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        except OSError: # a read-only cache directory only disables the disk cache
+            return None
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(source())
+            os.replace(temporary, path)
+        except OSError:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            return None
+    try:
+        if not _trusted(path):
+            return None
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except Exception: # a broken file is regenerated in memory instead
+        return None
+    return module
@@ -0,0 +1,202 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from parser import to_postfix
+from thompson import postfix_to_nfa
+from glushkov import postfix_to_glushkov
+from subset import nfa_to_dfa
+from derivatives import postfix_to_dfa
+from minimise import minimise_dfa
+from automata import DFA
+
+__all__ = ["compile_regex", "cache_info", "cache_directory", "private_directory", "RegexCache",
+           "PIPELINE_VERSION", "CONSTRUCTIONS"]
+
+# part of the disk cache key: bump it whenever a stage of the pipeline changes its output
+PIPELINE_VERSION = 5
+
+def cache_directory() -> str:
+    """
+    The directory of the disk caches: $LFA_REGEX_CACHE, or ~/.cache/lfa-regex.
+    """
+    return os.environ.get("LFA_REGEX_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "lfa-regex"))
+
+def private_directory(path: str) -> bool:
+    """
+    Creates path with mode 0700 if needed and tells whether only the current user can write
+    into it: cached files are unpickled or imported, so a directory anyone else could write
+    into is not used at all.
+    """
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.stat(path)
+    except OSError:
+        return False
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        return False
+    return info.st_mode & 0o077 == 0
+
+# ways of building a DFA from the postfix tokens, before minimisation
+CONSTRUCTIONS = {
+    "thompson": lambda postfix: nfa_to_dfa(postfix_to_nfa(postfix)),
+    "glushkov": lambda postfix: nfa_to_dfa(postfix_to_glushkov(postfix)),
+    "derivatives": postfix_to_dfa,
+}
+
+def build(regex: str, construction: str = "thompson") -> DFA:
+    """
+    The whole pipeline, without any cache.
+    """
+    return minimise_dfa(CONSTRUCTIONS[construction](to_postfix(regex)))
+
+class RegexCache:
+    """
+    Minimal DFAs by regex: an in-process LRU of at most maxsize DFAs, backed by a directory
+    of pickled DFAs shared by the processes of the user (None disables it). The directory must
+    belong to the user and be closed to everyone else (it is created with mode 0700), otherwise
+    the disk cache is off. It is keyed by the regex, the construction and PIPELINE_VERSION and
+    holds about max_disk_entries files: the files are counted as they are written, and past the
+    bound the least recently used ones (by modification time, refreshed on every hit) are evicted
+    down to 90% of it, so the directory is only scanned once in a while.
+    A file that cannot be read back is a miss.
+    The same DFA object is returned for repeated calls, so it should not be modified.
+    """
+    def __init__(self, maxsize: int = 256, directory: str | None = "", max_disk_entries: int = 10_000):
+        self.maxsize = maxsize
+        self.directory = cache_directory() if directory == "" else directory
+        self.max_disk_entries = max_disk_entries
+        self._disk_entries: int | None = None # counted on the first disk access, None until then
+        self._memory: OrderedDict[tuple[str, str], DFA] = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def compile(self, regex: str, construction: str = "thompson") -> DFA:
+        if construction not in CONSTRUCTIONS:
+            raise ValueError(f"Unknown construction {construction!r}.")
+        key = (regex, construction)
+        dfa = self._memory.get(key)
+        if dfa is not None:
+            self.hits += 1
+            self._memory.move_to_end(key)
+            return dfa
+
+        dfa = self._load(key)
+        if dfa is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            dfa = build(regex, construction)
+            self._store(key, dfa)
+
+        self._memory[key] = dfa
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+        return dfa
+
+    def _path(self, key: tuple[str, str]) -> str:
+        regex, construction = key
+        digest = hashlib.sha256(f"{PIPELINE_VERSION}\0{construction}\0{regex}".encode()).hexdigest()
+        return os.path.join(self.directory, digest + ".pickle")
+
+    def _disk(self) -> bool:
+        """
+        Whether the disk cache is on, checking the directory and counting its files the first time.
+        """
+        if self.directory is None:
+            return False
+        if self._disk_entries is None:
+            if not private_directory(self.directory):
+                self.directory = None
+                return False
+            self._disk_entries = len(self._entries())
+        return True
+
+    def _entries(self) -> list:
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith(".pickle")]
+
+    def _load(self, key: tuple[str, str]) -> DFA | None:
+        if not self._disk():
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                version, cached_key, parts = pickle.load(f)
+            if version != PIPELINE_VERSION or cached_key != key:
+                return None
+            dfa = DFA(*parts)
+            os.utime(path) # most recently used
+        except Exception: # missing, truncated or foreign files are all misses
+            return None
+        return dfa
+
+    def _store(self, key: tuple[str, str], dfa: DFA) -> None:
+        if not self._disk():
+            return
+        parts = (dfa.states, dfa.alphabet, dfa.transition, dfa.initial_state, dfa.final_states)
+        path = self._path(key)
+        try:
+            fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError: # a read-only cache directory only disables the disk cache
+            return
+        try:
+            new = not os.path.exists(path)
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((PIPELINE_VERSION, key, parts), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+        except OSError:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            return
+        if new:
+            self._disk_entries += 1
+            if self._disk_entries > self.max_disk_entries:
+                self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        # other processes write here as well, so the count is refreshed from the directory
+        entries = self._entries()
+        keep = self.max_disk_entries * 9 // 10
+        self._disk_entries = len(entries)
+        if len(entries) <= keep:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - keep]:
+            try:
+                os.unlink(entry.path)
+                self.evictions += 1
+            except OSError: # removed by another process already
+                pass
+            self._disk_entries -= 1
+
+    def clear(self, disk: bool = False) -> None:
+        self._memory.clear()
+        if disk and self._disk():
+            for entry in self._entries():
+                os.unlink(entry.path)
+            self._disk_entries = 0
+
+    def info(self) -> dict:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._memory),
+            "maxsize": self.maxsize,
+        }
+
+_default = RegexCache()
+
+def compile_regex(regex: str, construction: str = "thompson") -> DFA:
+    """
+    The minimal DFA of regex, from the default RegexCache.
+    """
+    return _default.compile(regex, construction)
+
+def cache_info() -> dict:
+    return _default.info()
@@ -0,0 +1,229 @@
+from collections import deque
+from automata import DFA
+from charclass import CharClass, RangeIndex, symbol_classes
+
+__all__ = ["DerivativeDFA", "postfix_to_dfa"]
+
+EMPTY, EPSILON, SYMBOL, CONCAT, UNION, STAR = range(6)
+
+class _Term:
+    """
+    A regex term. Terms are hash-consed by DerivativeDFA: there is a single object for every
+    normalised term, so equality is identity and a term can be a DFA state as it is.
+    """
+    __slots__ = ("kind", "args", "id", "nullable", "derivatives")
+
+    def __init__(self, kind: int, args: tuple, id: int, nullable: bool):
+        self.kind = kind
+        self.args = args
+        self.id = id
+        self.nullable = nullable
+        self.derivatives: dict = {} # symbol -> derivative, filled on demand
+
+class DerivativeDFA:
+    """
+    Builds a DFA straight from the postfix tokens with Brzozowski derivatives: the states are
+    the regex terms reached by deriving the regex symbol by symbol, so no NFA is needed.
+    Terms are normalised while they are built (∅ and ε simplified away, concatenations nested to
+    the right, unions flattened, deduplicated and sorted by id: associativity, commutativity and
+    idempotence), which makes the similar derivatives the same object and keeps their number finite.
+    Every derivative is memoized per (term, symbol).
+
+    The symbols are the classes of symbol_classes, like in nfa_to_dfa. accepts explores only
+    the states the input needs, to_dfa builds all of them.
+    """
+    def __init__(self, tokens: list):
+        self._table: dict[tuple, _Term] = {}
+        self.empty = self._make(EMPTY, (), False)
+        self.epsilon = self._make(EPSILON, (), True)
+
+        labels = {token for token in tokens if token not in {'.', '|', '*', '+', '?'}}
+        self.symbols, cover = symbol_classes(labels)
+        self._cover = {label: set(classes) for label, classes in cover.items()}
+        self._columns = {symbol: symbol for symbol in self.symbols if isinstance(symbol, str)}
+        self._ranges = RangeIndex(self.symbols)
+        self.start = self._parse(tokens)
+
+    def _make(self, kind: int, args: tuple, nullable: bool) -> _Term:
+        key = (kind, args)
+        term = self._table.get(key)
+        if term is None:
+            term = self._table[key] = _Term(kind, args, len(self._table), nullable)
+        return term
+
+    def symbol(self, label) -> _Term:
+        return self._make(SYMBOL, (label,), False)
+
+    def concat(self, left: _Term, right: _Term) -> _Term:
+        if left is self.empty or right is self.empty:
+            return self.empty
+        if left is self.epsilon:
+            return right
+        if right is self.epsilon:
+            return left
+        if left.kind == CONCAT:
+            # (ab)c = a(bc): concatenations are kept nested to the right, so a derivative only
+            # has to look at the head. The chain is walked without recursion, for long literals.
+            parts = []
+            while left.kind == CONCAT:
+                parts.append(left.args[0])
+                left = left.args[1]
+            parts.append(left)
+            for part in reversed(parts):
+                right = self.concat(part, right)
+            return right
+        return self._make(CONCAT, (left, right), left.nullable and right.nullable)
+
+    def union(self, *terms: _Term) -> _Term:
+        members: set[_Term] = set()
+        for term in terms:
+            if term.kind == UNION:
+                members.update(term.args)
+            elif term is not self.empty:
+                members.add(term)
+        if not members:
+            return self.empty
+        if len(members) == 1:
+            return members.pop()
+        args = tuple(sorted(members, key=lambda term: term.id))
+        return self._make(UNION, args, any(term.nullable for term in args))
+
+    def star(self, term: _Term) -> _Term:
+        if term is self.empty or term is self.epsilon:
+            return self.epsilon
+        if term.kind == STAR:
+            return term
+        return self._make(STAR, (term,), True)
+
+    def _sequence(self, terms: list[_Term]) -> _Term:
+        sequence = self.epsilon
+        for term in reversed(terms):
+            sequence = self.concat(term, sequence)
+        return sequence
+
+    def _parse(self, tokens: list) -> _Term:
+        # the postfix nests concatenations to the left, so the stack holds lists of terms to
+        # concatenate, and a list becomes a right-nested term only when an operator needs it
+        stack: list[list[_Term]] = []
+        for token in tokens:
+            if token == '.':
+                right = stack.pop()
+                stack[-1].extend(right)
+            elif token == '|':
+                right = self._sequence(stack.pop())
+                stack.append([self.union(self._sequence(stack.pop()), right)])
+            elif token == '*':
+                stack.append([self.star(self._sequence(stack.pop()))])
+            elif token == '+':
+                term = self._sequence(stack.pop())
+                stack.append([term, self.star(term)])
+            elif token == '?':
+                stack.append([self.union(self._sequence(stack.pop()), self.epsilon)])
+            else:
+                stack.append([self.symbol(token)])
+        return self._sequence(stack.pop())
+
+    def derive(self, term: _Term, symbol) -> _Term:
+        """
+        The derivative of term with respect to symbol (one of self.symbols). The subterms are
+        derived first with an explicit stack instead of recursion, so long sequences like a?a?a?...
+        do not hit the recursion limit.
+        """
+        derivative = term.derivatives.get(symbol)
+        if derivative is not None:
+            return derivative
+
+        stack = [term]
+        while stack:
+            node = stack[-1]
+            if symbol in node.derivatives:
+                stack.pop()
+                continue
+            missing = [part for part in self._parts(node) if symbol not in part.derivatives]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            node.derivatives[symbol] = self._derive_node(node, symbol)
+        return term.derivatives[symbol]
+
+    @staticmethod
+    def _parts(term: _Term) -> tuple:
+        # the subterms whose derivatives the derivative of term is made of
+        if term.kind == CONCAT:
+            return term.args if term.args[0].nullable else term.args[:1]
+        if term.kind in (UNION, STAR):
+            return term.args
+        return ()
+
+    def _derive_node(self, term: _Term, symbol) -> _Term:
+        # the derivatives of the parts of term are already known
+        kind = term.kind
+        if kind == SYMBOL:
+            return self.epsilon if symbol in self._cover[term.args[0]] else self.empty
+        if kind == CONCAT:
+            left, right = term.args
+            derivative = self.concat(left.derivatives[symbol], right)
+            if left.nullable:
+                derivative = self.union(derivative, right.derivatives[symbol])
+            return derivative
+        if kind == UNION:
+            return self.union(*(member.derivatives[symbol] for member in term.args))
+        if kind == STAR:
+            return self.concat(term.args[0].derivatives[symbol], term)
+        return self.empty # ∅ and ε
+
+    def symbol_of(self, char: str) -> str | CharClass | None:
+        symbol = self._columns.get(char)
+        if symbol is None and self._ranges:
+            symbol = self._ranges.find(char)
+        return symbol
+
+    def accepts(self, string: str) -> bool:
+        term = self.start
+        for char in string:
+            symbol = self.symbol_of(char)
+            if symbol is None:
+                return False
+            term = self.derive(term, symbol)
+            if term is self.empty:
+                return False
+        return term.nullable
+
+    def accepts_many(self, words) -> list[bool]:
+        accepts = self.accepts
+        return [accepts(word) for word in words]
+
+    def to_dfa(self) -> DFA:
+        """
+        Every derivative reachable from the regex, named q0, q1, ... in BFS order.
+        The ∅ term is the dead state and is left out, like in nfa_to_dfa.
+        """
+        names = {self.start: "q0"}
+        transitions: dict[str, dict] = {}
+        queue = deque([self.start])
+        while queue:
+            term = queue.popleft()
+            for symbol in self.symbols:
+                derivative = self.derive(term, symbol)
+                if derivative is self.empty:
+                    continue
+                if derivative not in names:
+                    names[derivative] = f"q{len(names)}"
+                    queue.append(derivative)
+                transitions.setdefault(names[term], {})[symbol] = names[derivative]
+
+        finals = {name for term, name in names.items() if term.nullable}
+        return DFA(set(names.values()), set(self.symbols), transitions, "q0", finals)
+
+    def stats(self) -> dict:
+        return {
+            "terms": len(self._table),
+            "derivatives": sum(len(term.derivatives) for term in self._table.values()),
+        }
+
+def postfix_to_dfa(tokens: list) -> DFA:
+    """
+    The DFA of the derivatives of a regex in postfix notation.
+    """
+    return DerivativeDFA(tokens).to_dfa()
@@ -0,0 +1,121 @@
+import os
+import shutil
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+
+__all__ = ["write_dot", "sample_states", "render", "Renderer"]
+
+def _quote(text) -> str:
+    return '"' + str(text).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def _targets(destination) -> tuple:
+    # DFA transitions lead to one state, NFA transitions to a set of states
+    return (destination,) if isinstance(destination, str) else tuple(destination)
+
+def sample_states(automaton, max_states: int) -> list[str]:
+    """
+    The first max_states states reached by a BFS from the initial state: the neighbourhood
+    of the start, which is the part of a large automaton worth looking at.
+    """
+    seen = {automaton.initial_state}
+    order = [automaton.initial_state]
+    queue = deque(order)
+    while queue and len(order) < max_states:
+        state = queue.popleft()
+        for destination in automaton.transition.get(state, {}).values():
+            for target in _targets(destination):
+                if target not in seen and len(order) < max_states:
+                    seen.add(target)
+                    order.append(target)
+                    queue.append(target)
+    return order
+
+def write_dot(automaton, out, name: str = "automaton", max_states: int | None = None) -> None:
+    """
+    Writes the DOT source of a DFA or NFA to the text file out, one line at a time, without
+    building the graph in memory. The edges between two states are merged into one, labelled
+    with all their symbols. With max_states, only the neighbourhood of the start given by
+    sample_states is drawn, and the edges leaving it go to a single "more states" node.
+    """
+    states = automaton.states | set(automaton.transition) | {automaton.initial_state}
+    if max_states is not None and len(states) > max_states:
+        shown = sample_states(automaton, max_states)
+    else:
+        shown = sorted(states)
+    kept = set(shown)
+
+    out.write(f"digraph {_quote(name)} {{\n")
+    out.write('\tgraph [fontname=Helvetica fontsize=12 labelloc=t rankdir=LR]\n')
+    out.write('\tnode [fontname=Helvetica]\n')
+    out.write('\t"__start" [label="" shape=point]\n')
+    out.write(f'\t"__start" -> {_quote(automaton.initial_state)} [label=""]\n')
+    for state in shown:
+        shape = "doublecircle" if state in automaton.final_states else "circle"
+        out.write(f"\t{_quote(state)} [shape={shape}]\n")
+
+    elided = False
+    for src in shown:
+        grouped: dict[str, list] = {}
+        for sym, destination in automaton.transition.get(src, {}).items():
+            for dst in _targets(destination):
+                grouped.setdefault(dst, []).append(sym)
+        leaves = False
+        for dst, syms in grouped.items():
+            if dst not in kept:
+                leaves = True
+                continue
+            label = ",".join(map(str, sorted(syms)))
+            out.write(f"\t{_quote(src)} -> {_quote(dst)} [label={_quote(label)}]\n")
+        if leaves:
+            elided = True
+            out.write(f'\t{_quote(src)} -> "__more" [style=dashed]\n')
+
+    if elided:
+        more = len(states) - len(shown)
+        out.write(f'\t"__more" [label="{more} more states" shape=plaintext]\n')
+    out.write("}\n")
+
+def render(automaton, path: str, format: str = "png", name: str = "automaton",
+           max_states: int | None = None) -> str:
+    """
+    Writes path.dot and runs the dot program of Graphviz on it, producing path.<format>
+    (the .dot file is removed afterwards). Returns the path of the image.
+    """
+    program = shutil.which("dot")
+    if program is None:
+        raise RuntimeError("Graphviz dot not installed.")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    source, image = f"{path}.dot", f"{path}.{format}"
+    with open(source, "w", encoding="utf-8") as out:
+        write_dot(automaton, out, name, max_states)
+    try:
+        subprocess.run([program, f"-T{format}", source, "-o", image], check=True, capture_output=True)
+    finally:
+        os.unlink(source)
+    return image
+
+class Renderer:
+    """
+    Renders diagrams in the background on a pool of threads: submit returns at once with a
+    Future of the image path, and dot runs as a separate process, so several diagrams are
+    produced at the same time while the caller goes on. The automata must not be changed
+    until their diagrams are done. As a context manager it waits for all of them on exit.
+    """
+    def __init__(self, workers: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dot")
+
+    def submit(self, automaton, path: str, format: str = "png", name: str = "automaton",
+               max_states: int | None = None) -> Future:
+        return self._pool.submit(render, automaton, path, format, name, max_states)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> "Renderer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,66 @@
+from automata import NFA
+import instrument
+
+__all__ = ["postfix_to_glushkov"]
+
+@instrument.stage("postfix_to_glushkov")
+def postfix_to_glushkov(tokens: list) -> NFA:
+    """
+    Glushkov's position automaton of a regex in postfix notation: a λ-free NFA with one state
+    q<i> per literal (position i, counted from 1 in the order of the postfix) plus the start state q0.
+    Every fragment is described by whether it is nullable and by its first and last positions;
+    concatenation and the loops of * and + add the pairs of consecutive positions to follow.
+    Then q0 goes to the first positions, a position to the ones that can follow it, each
+    transition labelled with the literal of its target, and the final states are the last
+    positions (and q0 if the regex accepts the empty word).
+    """
+    labels = [None] # labels[i] = literal of position i
+    follow: list[set[int]] = [set()]
+    stack: list[tuple[bool, set[int], set[int]]] = [] # fragments (nullable, first, last)
+
+    for token in tokens:
+        if token not in {'.', '|', '*', '+', '?'}:
+            position = len(labels)
+            labels.append(token)
+            follow.append(set())
+            stack.append((False, {position}, {position}))
+            continue
+
+        if token == '.':
+            nullable2, first2, last2 = stack.pop()
+            nullable1, first1, last1 = stack.pop()
+            for position in last1:
+                follow[position] |= first2
+            stack.append((
+                nullable1 and nullable2,
+                first1 | first2 if nullable1 else first1,
+                last1 | last2 if nullable2 else last2,
+            ))
+
+        elif token == '|':
+            nullable2, first2, last2 = stack.pop()
+            nullable1, first1, last1 = stack.pop()
+            stack.append((nullable1 or nullable2, first1 | first2, last1 | last2))
+
+        elif token in ('*', '+'):
+            nullable, first, last = stack.pop()
+            for position in last:
+                follow[position] |= first
+            stack.append((nullable or token == '*', first, last))
+
+        elif token == '?':
+            _, first, last = stack.pop()
+            stack.append((True, first, last))
+
+    nullable, first, last = stack.pop()
+    names = [f"q{i}" for i in range(len(labels))]
+    transitions: dict[str, dict[str, set[str]]] = {}
+    for source, targets in [(0, first)] + list(enumerate(follow))[1:]:
+        for target in targets:
+            transitions.setdefault(names[source], {}).setdefault(labels[target], set()).add(names[target])
+
+    finals = {names[position] for position in last}
+    if nullable:
+        finals.add(names[0])
+    instrument.count("nfa_states", len(names))
+    return NFA(set(names), set(labels[1:]), transitions, names[0], finals)
@@ -0,0 +1,101 @@
+import functools
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+__all__ = ["Stats", "collect", "stage", "count", "enabled"]
+
+# the Stats being collected, None when instrumentation is off
+_current = None
+
+class Stats:
+    """
+    What was recorded while collecting: for every stage the number of calls, the total wall time
+    and the largest peak of traced memory above what was allocated when it started (None without
+    memory tracing), and the domain counters. With jsonl (a text file) every stage call is written
+    as a JSON line when it ends, and the summary when the collection ends.
+    """
+    def __init__(self, memory: bool = False, jsonl=None):
+        self.memory = memory
+        self.jsonl = jsonl
+        self.stages: dict[str, dict] = {}
+        self.counters: dict[str, int] = {}
+
+    def _run(self, name: str, fn, args, kwargs):
+        if self.memory:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] - base if self.memory else None
+            record = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "peak_bytes": None})
+            record["calls"] += 1
+            record["seconds"] += seconds
+            if peak is not None:
+                record["peak_bytes"] = max(record["peak_bytes"] or 0, peak)
+            if self.jsonl is not None:
+                self.jsonl.write(json.dumps({"stage": name, "seconds": seconds, "peak_bytes": peak}) + "\n")
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def to_dict(self) -> dict:
+        return {"stages": self.stages, "counters": self.counters}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+@contextmanager
+def collect(memory: bool = False, jsonl=None):
+    """
+    Turns instrumentation on for the body of the with statement and yields its Stats:
+
+        with instrument.collect(memory=True) as stats:
+            build(regex)
+        print(stats.to_dict())
+
+    memory=True traces allocations with tracemalloc (much slower). Stages are not expected to
+    nest; a nested stage resets the memory peak of the one around it.
+    """
+    global _current
+    previous = _current
+    stats = _current = Stats(memory, jsonl)
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        yield stats
+    finally:
+        _current = previous
+        if started_tracing:
+            tracemalloc.stop()
+        if jsonl is not None:
+            jsonl.write(json.dumps({"summary": stats.to_dict()}) + "\n")
+
+def enabled() -> bool:
+    return _current is not None
+
+def stage(name: str):
+    """
+    Decorator recording the calls of a pipeline stage. When nothing is collecting, the only
+    cost is one extra call and a test of a global.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current is None:
+                return fn(*args, **kwargs)
+            return _current._run(name, fn, args, kwargs)
+        return wrapper
+    return decorate
+
+def count(name: str, amount: int = 1) -> None:
+    """
+    Adds amount to a counter. Meant to be called once per stage with totals, not in the hot loops.
+    """
+    if _current is not None:
+        _current.count(name, amount)
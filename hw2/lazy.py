@@ -0,0 +1,138 @@
+from automata import NFA
+
+__all__ = ["LazyDFA"]
+
+class _State:
+    """
+    A DFA state built on demand: the subset of NFA states as a bitmask and the transitions
+    found so far, by symbol class number, pointing straight to the next _State.
+    """
+    __slots__ = ("subset", "final", "next")
+
+    def __init__(self, subset: int, final: bool):
+        self.subset = subset
+        self.final = final
+        self.next: dict[int, "_State"] = {}
+
+class LazyDFA:
+    """
+    Matches with an NFA as if it was determinised, but only the subsets actually reached by
+    the input are built, and every (subset, symbol class) -> subset transition is memoized.
+    This avoids the exponential blow-up of nfa_to_dfa on patterns like (a|b)*a(a|b)...(a|b).
+    Transitions are keyed by the symbol class of the character (see CompiledNFA.symbol_class),
+    so a state has at most one transition per class, even for . or [^...] on varied text.
+
+    The cache holds at most max_states subsets. When it is full it is flushed completely,
+    which is cheaper than keeping track of the least recently used states. Rebuilding the cache
+    costs up to max_states misses, so it is only flushed if at least max_states / (1 - min_hit_ratio)
+    steps went by since the previous flush: then the rebuilding is at most 1 - min_hit_ratio of the
+    steps. Before that the cache is thrashing, and the rest of the word is read with the plain
+    bitset NFA simulation. The simulated steps count towards the next flush, so after a change of
+    input the cache is flushed again and fills with the new working set.
+    """
+    def __init__(self, nfa: NFA, max_states: int = 10_000, min_hit_ratio: float = 0.9):
+        self.nfa = nfa.compile()
+        self.max_states = max_states
+        self.min_hit_ratio = min_hit_ratio
+        self.hits = 0
+        self.misses = 0
+        self.simulated = 0
+        self.flushes = 0
+        self.fallbacks = 0
+        # symbol class number of every character seen, and the symbol of every class number
+        self._columns: dict[str, int] = {}
+        self._symbols: list = []
+        self._cache: dict[int, _State] = {}
+        self._start = self._intern(self.nfa.initial_state)
+        # steps (hits, misses and simulated) at the last flush
+        self._flush_steps = 0
+
+    def _intern(self, subset: int) -> _State:
+        state = self._cache.get(subset)
+        if state is None:
+            state = _State(subset, subset & self.nfa.final_states != 0)
+            self._cache[subset] = state
+        return state
+
+    def _column(self, char: str) -> int | None:
+        symbol = self.nfa.symbol_class(char)
+        if symbol is None:
+            return None
+        column = self._columns.get(symbol)
+        if column is None:
+            # the symbol itself is entered too, so the other characters of its class find its number
+            column = self._columns[symbol] = len(self._symbols)
+            self._symbols.append(symbol)
+        self._columns[char] = column
+        return column
+
+    def _thrashing(self) -> bool:
+        steps = self.hits + self.misses + self.simulated - self._flush_steps
+        return steps * (1 - self.min_hit_ratio) < self.max_states
+
+    def _flush(self, current: _State) -> _State:
+        self.flushes += 1
+        self._flush_steps = self.hits + self.misses + self.simulated
+        self._cache.clear()
+        self._start = self._intern(self.nfa.initial_state)
+        # the old objects still link to each other, so the current state is rebuilt as well
+        return self._intern(current.subset)
+
+    def accepts(self, string: str) -> bool:
+        state = self._start
+        columns = self._columns
+        hits = 0 # kept local on the hot path, added to self.hits on every miss
+        for position, char in enumerate(string):
+            column = columns.get(char)
+            if column is None:
+                column = self._column(char)
+                if column is None: # no transition reads char
+                    self.hits += hits
+                    self.misses += 1
+                    return False
+            following = state.next.get(column)
+            if following is not None:
+                hits += 1
+                state = following
+                continue
+
+            self.hits += hits
+            hits = 0
+            self.misses += 1
+            subset = self.nfa.step(state.subset, self._symbols[column])
+            if subset not in self._cache and len(self._cache) >= self.max_states:
+                if self._thrashing():
+                    self.fallbacks += 1
+                    return self._simulate(subset, string[position + 1:])
+                state = self._flush(state)
+            following = self._intern(subset)
+            state.next[column] = following
+            state = following
+            if not subset:
+                return False
+        self.hits += hits
+        return state.final
+
+    def _simulate(self, subset: int, rest: str) -> bool:
+        step = self.nfa.step
+        for i, char in enumerate(rest):
+            if not subset:
+                self.simulated += i
+                return False
+            subset = step(subset, char)
+        self.simulated += len(rest)
+        return subset & self.nfa.final_states != 0
+
+    def accepts_many(self, words) -> list[bool]:
+        accepts = self.accepts
+        return [accepts(word) for word in words]
+
+    def stats(self) -> dict:
+        return {
+            "states": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "simulated": self.simulated,
+            "flushes": self.flushes,
+            "fallbacks": self.fallbacks,
+        }
@@ -2,6 +2,7 @@ from parser import to_postfix
 from thompson import postfix_to_nfa
 from subset import nfa_to_dfa
 from minimise import minimise_dfa
+from dot import Renderer
 
 def main():
     regex = "(a|b)*a(a|b)"
@@ -10,9 +11,15 @@ def main():
     dfa = nfa_to_dfa(nfa)
     minimal_dfa = minimise_dfa(dfa)
 
-    nfa.render("./diagrams/nfa_diagram")
-    dfa.render("./diagrams/dfa_diagram")
-    minimal_dfa.render("./diagrams/minimal_dfa_diagram")
+    # the three diagrams are rendered at the same time, in the background
+    with Renderer() as renderer:
+        diagrams = [
+            renderer.submit(nfa, "./diagrams/nfa_diagram", name="NFA"),
+            renderer.submit(dfa, "./diagrams/dfa_diagram", name="DFA"),
+            renderer.submit(minimal_dfa, "./diagrams/minimal_dfa_diagram", name="DFA"),
+        ]
+    for diagram in diagrams:
+        diagram.result()
     print("Diagrams written to ./diagrams/")
 
 if __name__ == "__main__":
@@ -1,66 +1,133 @@
-from collections import defaultdict, deque
-from itertools import count
-from typing import Set, Dict
 from automata import DFA
+import instrument
 
 __all__ = ["minimise_dfa"]
 
+class _Partition:
+    """
+    Refinable partition of the states 0..n-1. The states of every block are contiguous in
+    elements, first/end delimit the block and location gives the position of a state, so a
+    state is marked by swapping it to the front of its block. Splitting the touched blocks
+    then costs only as much as the marked states.
+    """
+    def __init__(self, n: int):
+        self.elements = list(range(n))
+        self.location = list(range(n))
+        self.block_of = [0] * n
+        self.first = [0]
+        self.end = [n]
+        self.marked = [0]
+        self.touched: list[int] = []
+
+    def size(self, block: int) -> int:
+        return self.end[block] - self.first[block]
+
+    def members(self, block: int) -> list[int]:
+        return self.elements[self.first[block]:self.end[block]]
+
+    def mark(self, state: int) -> None:
+        block = self.block_of[state]
+        boundary = self.first[block] + self.marked[block]
+        position = self.location[state]
+        if position < boundary: # already marked
+            return
+        other = self.elements[boundary]
+        self.elements[position], self.elements[boundary] = other, state
+        self.location[other], self.location[state] = position, boundary
+        if self.marked[block] == 0:
+            self.touched.append(block)
+        self.marked[block] += 1
+
+    def split(self) -> list[int]:
+        """
+        Splits every touched block into its marked and unmarked states. The smaller part becomes
+        the new block, so the same block id keeps the larger one. Returns the new blocks.
+        """
+        new_blocks = []
+        for block in self.touched:
+            marked = self.marked[block]
+            self.marked[block] = 0
+            if marked == self.size(block):
+                continue
+            new_block = len(self.first)
+            boundary = self.first[block] + marked
+            if marked <= self.size(block) - marked:
+                self.first.append(self.first[block])
+                self.end.append(boundary)
+                self.first[block] = boundary
+            else:
+                self.first.append(boundary)
+                self.end.append(self.end[block])
+                self.end[block] = boundary
+            self.marked.append(0)
+            for position in range(self.first[new_block], self.end[new_block]):
+                self.block_of[self.elements[position]] = new_block
+            new_blocks.append(new_block)
+        self.touched = []
+        return new_blocks
+
+@instrument.stage("minimise_dfa")
 def minimise_dfa(dfa: DFA) -> DFA:
-    finals = set(dfa.final_states)
-    non_finals = set(dfa.states) - finals
-    P = [block for block in (finals, non_finals) if block]
-    W = deque(P.copy())
+    """
+    Hopcroft's algorithm in O(n log n) for a fixed alphabet.
+
+    Missing transitions go to an extra sink state, which makes the transition function total
+    (needed for the "smaller half" rule to be correct). The states equivalent to the sink are dead
+    and are left out of the result, like in nfa_to_dfa.
+    """
+    alphabet = sorted(dfa.alphabet)
+    names = sorted(dfa.states)
+    index = {state: i for i, state in enumerate(names)}
+    sink = len(names)
+    n = len(names) + 1
+
+    # inverse[c][q] = states going to q on alphabet[c]
+    inverse = [[[] for _ in range(n)] for _ in alphabet]
+    for p, state in enumerate(names):
+        row = dfa.transition.get(state, {})
+        for c, symbol in enumerate(alphabet):
+            q = index[row[symbol]] if symbol in row else sink
+            inverse[c][q].append(p)
+    for c in range(len(alphabet)):
+        inverse[c][sink].append(sink)
+
+    # initial partition: final states and non-final states (sink included)
+    partition = _Partition(n)
+    for state in dfa.final_states:
+        partition.mark(index[state])
+    # the new block is the smaller of the two
+    worklist = [(block, c) for block in partition.split() for c in range(len(alphabet))]
 
-    alphabet = set(dfa.alphabet)
-    inv: Dict[str, Dict[str, Set[str]]] = {c: defaultdict(set) for c in alphabet}
-    for p in dfa.states:
-        for c in alphabet:
-            q = dfa.transition.get(p, {}).get(c)
-            if q is not None:
-                inv[c][q].add(p)
+    while worklist:
+        splitter, c = worklist.pop()
+        preds = inverse[c]
+        for q in partition.members(splitter):
+            for p in preds[q]:
+                partition.mark(p)
+        # whether or not (block, c) is still waiting, adding the smaller half is enough
+        for new_block in partition.split():
+            worklist.extend((new_block, d) for d in range(len(alphabet)))
 
-    while W:
-        A = W.popleft()
-        for c in alphabet:
-            X = set()
-            for q in A:
-                X |= inv[c].get(q, set())
-            new_P = []
-            for Y in P:
-                inter = Y & X
-                diff = Y - X
-                if inter and diff:
-                    new_P.extend([inter, diff])
-                    if Y in W:
-                        W.remove(Y)
-                        W.extend([inter, diff])
-                    else:
-                        W.append(inter if len(inter) <= len(diff) else diff)
-                else:
-                    new_P.append(Y)
-            P = new_P
+    block_of = partition.block_of
+    dead = block_of[sink]
+    initial = block_of[index[dfa.initial_state]]
 
-    rep_map: Dict[str, str] = {}
-    state_counter = count(1)
-    initial_state_name = "q0"
-    for block in P:
-        if dfa.initial_state in block:
-            name = initial_state_name
-        else:
-            name = f"q{next(state_counter)}"
-        for state in block:
-            rep_map[state] = name
+    block_names = {initial: "q0"}
+    for block in range(len(partition.first)):
+        if block not in block_names and block != dead:
+            block_names[block] = f"q{len(block_names)}"
 
-    new_states = set(rep_map.values())
-    new_initial = rep_map[dfa.initial_state]
-    new_finals = {rep_map[s] for s in dfa.final_states}
-    new_transitions: Dict[str, Dict[str, str]] = {}
-    for p in dfa.states:
-        for c in alphabet:
-            q = dfa.transition.get(p, {}).get(c)
-            if q is not None:
-                p_new = rep_map[p]
-                q_new = rep_map[q]
-                new_transitions.setdefault(p_new, {})[c] = q_new
+    new_transitions: dict[str, dict[str, str]] = {}
+    for block, name in block_names.items():
+        if block == dead: # empty language, only the initial state is kept
+            continue
+        representative = partition.elements[partition.first[block]]
+        row = dfa.transition.get(names[representative], {})
+        for symbol in alphabet:
+            if symbol in row and block_of[index[row[symbol]]] != dead:
+                new_transitions.setdefault(name, {})[symbol] = block_names[block_of[index[row[symbol]]]]
 
-    return DFA(new_states, alphabet, new_transitions, new_initial, new_finals)
+    new_finals = {block_names[block_of[index[state]]] for state in dfa.final_states}
+    instrument.count("partition_splits", len(partition.first) - 1)
+    instrument.count("minimal_states", len(block_names))
+    return DFA(set(block_names.values()), set(dfa.alphabet), new_transitions, "q0", new_finals)
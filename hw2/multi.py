@@ -0,0 +1,90 @@
+from automata import NFA, LAMBDA
+from parser import to_postfix
+from thompson import postfix_to_nfa
+from subset import subset_construction
+
+__all__ = ["union_nfa", "MultiPattern"]
+
+def union_nfa(nfas: list[NFA]) -> NFA:
+    """
+    One λ-NFA for all the nfas: their states are renamed to p<i>.<state> and a shared
+    start state has a λ-transition to the initial state of every one of them.
+    """
+    start = "start"
+    states = {start}
+    alphabet: set[str] = set()
+    transitions: dict[str, dict[str, set[str]]] = {start: {LAMBDA: set()}}
+    finals: set[str] = set()
+
+    for i, nfa in enumerate(nfas):
+        prefix = f"p{i}."
+        states.update(prefix + state for state in nfa.states)
+        alphabet.update(nfa.alphabet)
+        for state, row in nfa.transition.items():
+            transitions[prefix + state] = {symbol: {prefix + target for target in targets}
+                                           for symbol, targets in row.items()}
+        transitions[start][LAMBDA].add(prefix + nfa.initial_state)
+        finals.update(prefix + state for state in nfa.final_states)
+
+    return NFA(states, alphabet, transitions, start, finals)
+
+class MultiPattern:
+    """
+    A single DFA for a list of regexes. Every DFA state is tagged with the ids (positions in
+    patterns) of the regexes it accepts, so one pass over a word tells which patterns match it.
+    The DFA is not minimised: Hopcroft would merge final states with different tags.
+    """
+    def __init__(self, patterns: list[str]):
+        self.patterns = list(patterns)
+        nfas = [postfix_to_nfa(to_postfix(pattern)) for pattern in self.patterns]
+        owner = {f"p{i}.{state}": i for i, nfa in enumerate(nfas) for state in nfa.final_states}
+
+        self.dfa, subsets = subset_construction(union_nfa(nfas))
+        self.compiled = self.dfa.compile()
+        # tags of the compiled states, and the pattern a token gets (lowest id wins, like in lex)
+        self.tags = [frozenset(owner[state] for state in subsets[name] if state in owner)
+                     for name in self.compiled.state_names]
+        self.priority = [min(tag) if tag else -1 for tag in self.tags]
+
+    def match(self, string: str) -> frozenset[int]:
+        """
+        Ids of the patterns matching the whole string.
+        """
+        state = self.compiled.run(self.compiled.initial_state, string)
+        return self.tags[state] if state >= 0 else frozenset()
+
+    def match_many(self, words) -> list[frozenset[int]]:
+        match = self.match
+        return [match(word) for word in words]
+
+    def tokenize(self, text: str):
+        """
+        Splits text into (pattern id, lexeme) tokens with maximal munch: every token is the longest
+        non-empty prefix of the rest of the text matched by some pattern, ties going to the lowest id.
+        The DFA is run once from every token start and stops as soon as it dies.
+        Raises ValueError if no pattern matches at some position.
+        """
+        table, columns, width = self.compiled.table, self.compiled.columns, self.compiled.width
+        initial, priority = self.compiled.initial_state, self.priority
+        position, length = 0, len(text)
+
+        while position < length:
+            state = initial
+            last_id, last_end = -1, position
+            i = position
+            while i < length:
+                column = columns.get(text[i])
+                if column is None:
+                    column = self.compiled.column(text[i])
+                    if column is None:
+                        break
+                state = table[state * width + column]
+                if state < 0:
+                    break
+                i += 1
+                if priority[state] >= 0:
+                    last_id, last_end = priority[state], i
+            if last_id < 0:
+                raise ValueError(f"No pattern matches at position {position}.")
+            yield last_id, text[position:last_end]
+            position = last_end
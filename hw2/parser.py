@@ -1,31 +1,130 @@
+from charclass import CharClass
+import instrument
+
 __all__ = ["to_postfix"]
 
-def tokenize(regex:str) -> list[str]:
+OPERATORS = set("|+*?()")
+
+# \d, \w and \s, ASCII-only (like re.ASCII, see the README); their negations are the uppercase letters
+SHORTHANDS = {
+    "d": [(ord("0"), ord("9"))],
+    "w": [(ord("0"), ord("9")), (ord("A"), ord("Z")), (ord("_"), ord("_")), (ord("a"), ord("z"))],
+    "s": [(ord(c), ord(c)) for c in " \t\n\r\f\v"],
+}
+CONTROLS = {"n": "\n", "t": "\t", "r": "\r", "f": "\f", "v": "\v", "0": "\0"}
+
+def _escape(regex: str, i: int) -> tuple[str | CharClass, int]:
     """
-    This breaks a regex into tokens (characters and the operators "|+*?()")
+    Reads the escape starting after the backslash at regex[i - 1]. Returns a character or
+    a class (for the shorthands) and the position after the escape.
+    """
+    if i >= len(regex):
+        raise ValueError("Dangling backslash at the end of the regex.")
+    char = regex[i]
+    if char.lower() in SHORTHANDS:
+        return CharClass(SHORTHANDS[char.lower()], negated=char.isupper()), i + 1
+    if char in CONTROLS:
+        return CONTROLS[char], i + 1
+    if char in "xu":
+        digits = 2 if char == "x" else 4
+        code = regex[i + 1:i + 1 + digits]
+        if len(code) != digits or any(c not in "0123456789abcdefABCDEF" for c in code):
+            raise ValueError(f"Bad \\{char} escape at position {i - 1}.")
+        return chr(int(code, 16)), i + 1 + digits
+    return char, i + 1
+
+def _char_class(regex: str, i: int) -> tuple[CharClass, int]:
+    """
+    Reads the class starting after the "[" at regex[i - 1]: characters, ranges like a-z and
+    escapes, negated by a leading "^". A "]" right after the opening bracket and a "-" at
+    either end are literal. Returns the class and the position after the closing "]".
+    """
+    start = i - 1
+    negated = i < len(regex) and regex[i] == "^"
+    if negated:
+        i += 1
+    ranges: list[tuple[int, int]] = []
+    first = True
+    while True:
+        if i >= len(regex):
+            raise ValueError(f"Unterminated character class at position {start}.")
+        char = regex[i]
+        if char == "]" and not first:
+            return CharClass(ranges, negated), i + 1
+        first = False
+        if char == "\\":
+            item, i = _escape(regex, i + 1)
+        else:
+            item, i = char, i + 1
+        if isinstance(item, CharClass):
+            ranges.extend(item.ranges)
+            continue
+        if i + 1 < len(regex) and regex[i] == "-" and regex[i + 1] != "]":
+            if regex[i + 1] == "\\":
+                end, i = _escape(regex, i + 2)
+                if isinstance(end, CharClass):
+                    raise ValueError(f"Bad range in character class at position {start}.")
+            else:
+                end, i = regex[i + 1], i + 2
+            if ord(end) < ord(item):
+                raise ValueError(f"Bad range {item}-{end} in character class at position {start}.")
+            ranges.append((ord(item), ord(end)))
+        else:
+            ranges.append((ord(item), ord(item)))
+
+def _lex(regex: str) -> list[str | CharClass]:
+    """
+    Splits a regex into operators, plain characters and classes. "[...]", "." (any character
+    but a newline), the shorthands and the escaped operators become CharClass tokens, so they
+    can never be mistaken for the operators, "." included.
+    """
+    tokens: list[str | CharClass] = []
+    i = 0
+    while i < len(regex):
+        char = regex[i]
+        if char == "[":
+            token, i = _char_class(regex, i + 1)
+        elif char == "\\":
+            token, i = _escape(regex, i + 1)
+            if isinstance(token, str) and token in OPERATORS | {".", "[", "]", "\\"}:
+                token = CharClass([(ord(token), ord(token))])
+        elif char == ".":
+            token, i = CharClass([(ord("\n"), ord("\n"))], negated=True), i + 1
+        else:
+            token, i = char, i + 1
+        tokens.append(token)
+    return tokens
+
+def tokenize(regex:str) -> list[str | CharClass]:
+    """
+    This breaks a regex into tokens (characters, classes and the operators "|+*?()")
     Also, it inserts "."as the concatenation operarator where it is implicit.
     """
-    tokens, L = [], len(regex)
-    operators = set("|+*?()")
+    tokens = []
+    lexed = _lex(regex)
+    L = len(lexed)
 
     # to verify that a token is not an operator
-    def is_literal(token: str) -> bool:
-        return bool(token and (token not in operators) and (token != "."))
+    def is_literal(token) -> bool:
+        if isinstance(token, CharClass):
+            return True
+        return bool(token and (token not in OPERATORS) and (token != "."))
 
     for i in range(0, L):
-        tokens.append(regex[i])
+        tokens.append(lexed[i])
 
         if i < L - 1:
-            current = regex[i]
-            next = regex[i+1]
-            if (is_literal(current) or current in ")*+?") and (is_literal(next) or next == "("):
+            current = lexed[i]
+            next = lexed[i+1]
+            if (is_literal(current) or current in (")", "*", "+", "?")) and (is_literal(next) or next == "("):
                 tokens.append(".")
 
 
     return tokens
 
 
-def to_postfix(regex: str) -> list[str]:
+@instrument.stage("to_postfix")
+def to_postfix(regex: str) -> list[str | CharClass]:
     """
 
     This converts regex into postfix using the Shunting-Yard algorithm.
@@ -35,11 +134,13 @@ def to_postfix(regex: str) -> list[str]:
     prec = {"|": 1, ".": 2, "*": 3, "+": 3, "?": 3}
     left_assoc = {"|", "."}
 
-    output: list[str] = []
+    output: list[str | CharClass] = []
     op_stack: list[str] = []
 
     for token in tokenize(regex):
-        if token in prec:
+        if isinstance(token, CharClass):
+            output.append(token)
+        elif token in prec:
             while ((op_stack and op_stack[-1] != "(") and
                 (prec[op_stack[-1]] > prec[token] or
                 (prec[op_stack[-1]] == prec[token] and token in left_assoc))):
@@ -56,4 +157,5 @@ def to_postfix(regex: str) -> list[str]:
 
     while op_stack:
         output.append(op_stack.pop())
-    return output
\ No newline at end of file
+    instrument.count("postfix_tokens", len(output))
+    return output
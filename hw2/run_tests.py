@@ -1,54 +1,238 @@
+import argparse
 import json
+import os
 import sys
+import tempfile
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from parser import to_postfix
 from thompson import postfix_to_nfa
+from glushkov import postfix_to_glushkov
+from derivatives import DerivativeDFA
 from subset import nfa_to_dfa
 from minimise import minimise_dfa
+from lazy import LazyDFA
+from automata import load_dfa
+import codegen
 
 GREEN = "\033[92m"
 RED = "\033[91m"
 RESET = "\033[0m"
 BLUE = "\033[94m"
 
-def test_all(json_path: str) -> None:
+BATCH_SIZE = 64 # cases sent to a worker at once
+CHUNK_SIZE = 1 << 16 # characters read from the JSON file at once
+MAX_COMPILED = 1024 # compiled regexes kept by every worker
+
+def stream_cases(json_path: str):
+    """
+    Yields the cases of a JSON array one by one, decoding it chunk by chunk with raw_decode
+    instead of loading the whole file, so only the case being read is held in memory.
+    """
+    decoder = json.JSONDecoder()
     with open(json_path, 'r') as f:
-        cases = json.load(f)
-
-    all_passed = True
-    for case in cases:
-        name = case['name']
-        regex = case['regex']
-        postfix = to_postfix(regex)
-        nfa = postfix_to_nfa(postfix)
-        dfa = nfa_to_dfa(nfa)
-        min_dfa = minimise_dfa(dfa)
-
-        print(f"=== {name}: {BLUE}{regex}{RESET} ===")
-        for tst in case['test_strings']:
-            inp = tst['input']
-            exp = tst['expected']
-
-            res_full = dfa.accepts(inp)
-            res_min  = min_dfa.accepts(inp)
-
-            status_full = f"{GREEN}OK{RESET}" if res_full == exp else f"{RED}FAIL{RESET}"
-            status_min  = f"{GREEN}OK{RESET}" if res_min  == exp else f"{RED}FAIL{RESET}"
-
-            print(f"  input={inp!r:8} expected={exp!s:5} "
-                  f"dfa={res_full!s:5}[{status_full}] "
-                  f"min={res_min!s:5}[{status_min}]")
-            if res_full != exp or res_min != exp:
-                all_passed = False
-
-    if all_passed:
-        print(f"\n{GREEN}All tests passed.{RESET}")
+        buffer, i, eof = "", 0, False
+        started = False
+
+        def fill():
+            nonlocal buffer, i, eof
+            chunk = f.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer, i = buffer[i:] + chunk, 0
+
+        while True:
+            while i < len(buffer) and buffer[i] in " \t\r\n" + ("," if started else ""):
+                i += 1
+            if i == len(buffer):
+                if eof:
+                    raise ValueError(f"Unexpected end of {json_path}.")
+                fill()
+                continue
+            if not started:
+                if buffer[i] != "[":
+                    raise ValueError(f"{json_path} does not hold a JSON array.")
+                started = True
+                i += 1
+                continue
+            if buffer[i] == "]":
+                return
+            try:
+                case, end = decoder.raw_decode(buffer, i)
+            except json.JSONDecodeError:
+                # the case goes on in the next chunk
+                if eof:
+                    raise
+                fill()
+                continue
+            i = end
+            yield case
+
+def _mapped(min_dfa):
+    # the binary file is unlinked once mapped, the mapping keeps its pages
+    fd, path = tempfile.mkstemp(suffix=".dfa")
+    os.close(fd)
+    try:
+        min_dfa.save(path)
+        return load_dfa(path)
+    finally:
+        os.unlink(path)
+
+def _codegen(min_dfa):
+    # generated code only for the DFAs small enough for it
+    if len(min_dfa.states) > codegen.MAX_STATES:
+        return None
+    return codegen.matcher(min_dfa, directory=None)
+
+# every way of matching, built from (postfix, Thompson NFA, DFA, minimal DFA); None skips it
+MATCHERS = {
+    "dfa": lambda postfix, nfa, dfa, min_dfa: dfa.accepts,
+    "min": lambda postfix, nfa, dfa, min_dfa: min_dfa.accepts,
+    "mapped": lambda postfix, nfa, dfa, min_dfa: _mapped(min_dfa).accepts,
+    "nfa": lambda postfix, nfa, dfa, min_dfa: nfa.compile().accepts,
+    "lazy": lambda postfix, nfa, dfa, min_dfa: LazyDFA(nfa).accepts,
+    "glushkov": lambda postfix, nfa, dfa, min_dfa: nfa_to_dfa(postfix_to_glushkov(postfix)).accepts,
+    "deriv": lambda postfix, nfa, dfa, min_dfa: DerivativeDFA(postfix).to_dfa().accepts,
+    "deriv_lazy": lambda postfix, nfa, dfa, min_dfa: DerivativeDFA(postfix).accepts,
+    "codegen": lambda postfix, nfa, dfa, min_dfa: _codegen(min_dfa),
+}
+DEFAULT_MATCHERS = ("dfa", "min")
+
+def build_matchers(regex: str, names=DEFAULT_MATCHERS) -> dict:
+    """
+    The matchers named in names for regex, which must all agree with the expected results.
+    """
+    postfix = to_postfix(regex)
+    nfa = postfix_to_nfa(postfix)
+    dfa = nfa_to_dfa(nfa)
+    min_dfa = minimise_dfa(dfa)
+    matchers = {}
+    for name in names:
+        accepts = MATCHERS[name](postfix, nfa, dfa, min_dfa)
+        if accepts is not None:
+            matchers[name] = accepts
+    return matchers
+
+# the matchers compiled by this process, by regex. Cases are routed to the workers by their
+# regex, so every regex is compiled by a single worker, once while it stays in the cache.
+_compiled: OrderedDict = OrderedDict()
+
+def run_case(case: dict, names=DEFAULT_MATCHERS) -> dict:
+    regex = case['regex']
+    start = time.perf_counter()
+    result = {"name": case['name'], "regex": regex, "compile_seconds": 0.0, "failures": [], "error": None}
+    matchers = _compiled.get(regex)
+    if matchers is None:
+        try:
+            matchers = build_matchers(regex, names)
+        except Exception as error:
+            result["error"] = f"{type(error).__name__}: {error}"
+            result["seconds"] = time.perf_counter() - start
+            return result
+        _compiled[regex] = matchers
+        if len(_compiled) > MAX_COMPILED:
+            _compiled.popitem(last=False)
+        result["compile_seconds"] = time.perf_counter() - start
+    else:
+        _compiled.move_to_end(regex)
+
+    for tst in case['test_strings']:
+        inp = tst['input']
+        exp = tst['expected']
+        for matcher_name, accepts in matchers.items():
+            try:
+                res = accepts(inp)
+            except Exception as error: # reported like a wrong answer, the other inputs still run
+                res = f"{type(error).__name__}: {error}"
+            if res != exp:
+                result["failures"].append({"matcher": matcher_name, "input": inp, "expected": exp, "got": res})
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def run_batch(cases: list[tuple[int, dict]], names=DEFAULT_MATCHERS) -> list[tuple[int, dict]]:
+    return [(index, run_case(case, names)) for index, case in cases]
+
+def run_all(json_path: str, workers: int, names=DEFAULT_MATCHERS) -> list[dict]:
+    """
+    Runs every case and returns the results in the order of the file. With workers > 0 the
+    cases are spread over that many single-process executors by the crc32 of their regex,
+    in batches, with a bounded number of batches in flight.
+    """
+    results: dict[int, dict] = {}
+    if workers <= 0:
+        for index, case in enumerate(stream_cases(json_path)):
+            results[index] = run_case(case, names)
+        return [results[index] for index in range(len(results))]
+
+    shards = [ProcessPoolExecutor(max_workers=1) for _ in range(workers)]
+    batches: list[list] = [[] for _ in range(workers)]
+    pending = set()
+
+    def collect(done):
+        for future in done:
+            results.update(future.result())
+
+    def submit(shard: int):
+        pending.add(shards[shard].submit(run_batch, batches[shard], names))
+        batches[shard] = []
+        while len(pending) > 4 * workers:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            pending.difference_update(done)
+            collect(done)
+
+    try:
+        count = 0
+        for index, case in enumerate(stream_cases(json_path)):
+            shard = zlib.crc32(case['regex'].encode()) % workers
+            batches[shard].append((index, case))
+            count += 1
+            if len(batches[shard]) == BATCH_SIZE:
+                submit(shard)
+        for shard in range(workers):
+            if batches[shard]:
+                submit(shard)
+        collect(pending)
+    finally:
+        for executor in shards:
+            executor.shutdown(cancel_futures=True)
+    return [results[index] for index in range(count)]
+
+def test_all(json_path: str, workers: int = 0, results_path: str | None = None,
+             names=DEFAULT_MATCHERS) -> None:
+    start = time.perf_counter()
+    results = run_all(json_path, workers, names)
+    seconds = time.perf_counter() - start
+
+    failed = [result for result in results if result["error"] or result["failures"]]
+    for result in failed:
+        print(f"=== {result['name']}: {BLUE}{result['regex']}{RESET} ({result['seconds'] * 1000:.1f} ms) ===")
+        if result["error"]:
+            print(f"  {RED}ERROR{RESET} {result['error']}")
+        for failure in result["failures"]:
+            print(f"  {RED}FAIL{RESET} {failure['matcher']}: input={failure['input']!r} "
+                  f"expected={failure['expected']} got={failure['got']}")
+
+    if results_path:
+        summary = {"cases": len(results), "failed": len(failed), "seconds": seconds, "results": results}
+        with open(results_path, 'w') as f:
+            json.dump(summary, f, indent=1)
+
+    if not failed:
+        print(f"{GREEN}All tests passed.{RESET} {len(results)} cases in {seconds:.2f} s")
         sys.exit(0)
     else:
-        print(f"\n{RED}Some tests failed.{RESET}")
+        print(f"\n{RED}Some tests failed.{RESET} {len(failed)} of {len(results)} cases in {seconds:.2f} s")
         sys.exit(1)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python run_tests.py path/to/cases.json")
-        sys.exit(2)
-    test_all(sys.argv[1])
+    cli = argparse.ArgumentParser(description="Checks every matcher on the cases of a JSON file.")
+    cli.add_argument("cases", help="path/to/cases.json")
+    cli.add_argument("--workers", type=int, default=0,
+                     help="worker processes, 0 (the default) runs the cases in this process")
+    cli.add_argument("--results", help="write the result of every case to this JSON file")
+    cli.add_argument("--matchers", nargs="+", choices=sorted(MATCHERS) + ["all"], default=list(DEFAULT_MATCHERS),
+                     help="the ways of matching to check (default: dfa min), all for every one of them")
+    args = cli.parse_args()
+    names = tuple(MATCHERS) if "all" in args.matchers else tuple(args.matchers)
+    test_all(args.cases, args.workers, args.results, names)
@@ -0,0 +1,154 @@
+from array import array
+from parser import to_postfix
+from thompson import postfix_to_nfa
+from subset import nfa_to_dfa
+from minimise import minimise_dfa
+
+__all__ = ["Match", "Searcher", "search", "finditer", "findall"]
+
+class Match:
+    __slots__ = ("string", "start", "end")
+
+    def __init__(self, string: str, start: int, end: int):
+        self.string = string
+        self.start = start
+        self.end = end
+
+    def span(self) -> tuple[int, int]:
+        return self.start, self.end
+
+    def group(self) -> str:
+        return self.string[self.start:self.end]
+
+    def __repr__(self) -> str:
+        return f"Match(span={self.span()}, match={self.group()!r})"
+
+class Searcher:
+    """
+    Leftmost-longest search of a regex inside a text, with the minimal DFA of R (anchored) and
+    one backward pass over the text. Reading it from the end, the pass finds for every position i
+    the set live[i] of DFA states from which some prefix of text[i:] is accepted:
+        live[len(text)] = final states,  live[i] = final states | {q : δ(q, text[i]) in live[i + 1]}
+    A match starts at i exactly when the initial state is in live[i], and a scan from there can
+    stop as soon as its state leaves live: no longer match is ahead. Every (set, symbol) step is
+    computed once from the inverse transitions and then memoized, like a lazy DFA read backwards.
+    Characters outside the alphabet cannot be part of a match, so they reset live to the final states.
+
+    The backward pass takes n steps, and every anchored scan stops one step after its match, which
+    the next scan starts after: finditer and findall take a linear number of DFA steps.
+    """
+    # interned live sets kept between texts before the cache is flushed
+    MAX_SETS = 10_000
+
+    def __init__(self, regex: str):
+        self.regex = regex
+        dfa = self.anchored = minimise_dfa(nfa_to_dfa(postfix_to_nfa(to_postfix(regex)))).compile()
+        n_states, width = len(dfa.final_states), dfa.width
+        self._finals = 0
+        for state in range(n_states):
+            if dfa.final_states[state]:
+                self._finals |= 1 << state
+        # inverse[column][state] = mask of the states going to state on column
+        self._inverse = [[0] * n_states for _ in range(width)]
+        for state in range(n_states):
+            for column in range(width):
+                target = dfa.table[state * width + column]
+                if target >= 0:
+                    self._inverse[column][target] |= 1 << state
+        self._flush()
+
+    def _flush(self) -> None:
+        self._sets = [self._finals] # live sets by id, 0 being the final states alone
+        self._ids = {self._finals: 0}
+        self._starts_at = [self._finals >> self.anchored.initial_state & 1]
+        self._steps: dict[int, int] = {} # id * width + column -> id
+
+    def _step(self, current: int, column: int) -> int:
+        live, inverse = self._sets[current], self._inverse[column]
+        previous = self._finals
+        while live:
+            lowest = live & -live
+            previous |= inverse[lowest.bit_length() - 1]
+            live ^= lowest
+        following = self._ids.get(previous)
+        if following is None:
+            following = self._ids[previous] = len(self._sets)
+            self._sets.append(previous)
+            self._starts_at.append(previous >> self.anchored.initial_state & 1)
+        self._steps[current * self.anchored.width + column] = following
+        return following
+
+    def _live(self, text: str) -> tuple[array, bytearray, list[int]]:
+        """
+        The id of live[i] for every position i from 0 to len(text), starts[i] = 1 if a match starts
+        at i, and the list of sets the ids refer to (a later flush does not change it).
+        """
+        if len(self._sets) > self.MAX_SETS:
+            self._flush()
+        dfa = self.anchored
+        columns, width, steps, starts_at = dfa.columns, dfa.width, self._steps, self._starts_at
+        live = array('i', [0]) * (len(text) + 1)
+        starts = bytearray(len(text) + 1)
+        current = 0
+        starts[len(text)] = starts_at[0]
+        for i in range(len(text) - 1, -1, -1):
+            column = columns.get(text[i])
+            if column is None:
+                column = dfa.column(text[i])
+            if column is None:
+                current = 0
+            else:
+                following = steps.get(current * width + column)
+                current = self._step(current, column) if following is None else following
+            live[i] = current
+            starts[i] = starts_at[current]
+        return live, starts, self._sets
+
+    def _longest(self, text: str, start: int, live: array, sets: list[int]) -> int:
+        dfa = self.anchored
+        table, columns, width, finals = dfa.table, dfa.columns, dfa.width, dfa.final_states
+        state = dfa.initial_state
+        end = start if finals[state] else -1
+        for j in range(start, len(text)):
+            column = columns.get(text[j])
+            if column is None:
+                column = dfa.column(text[j])
+                if column is None:
+                    break
+            state = table[state * width + column]
+            # past the longest match the state cannot accept anything of the rest of the text
+            if state < 0 or not sets[live[j + 1]] >> state & 1:
+                break
+            if finals[state]:
+                end = j + 1
+        return end
+
+    def finditer(self, text: str):
+        """
+        The non-overlapping leftmost-longest matches, left to right. Like re.finditer, an empty
+        match may follow a non-empty one, and the search moves on by one character after an empty match.
+        """
+        live, starts, sets = self._live(text)
+        position = 0
+        while position <= len(text):
+            start = starts.find(1, position)
+            if start < 0:
+                return
+            end = self._longest(text, start, live, sets)
+            yield Match(text, start, end)
+            position = end if end > start else end + 1
+
+    def search(self, text: str) -> Match | None:
+        return next(self.finditer(text), None)
+
+    def findall(self, text: str) -> list[str]:
+        return [match.group() for match in self.finditer(text)]
+
+def search(regex: str, text: str) -> Match | None:
+    return Searcher(regex).search(text)
+
+def finditer(regex: str, text: str):
+    return Searcher(regex).finditer(text)
+
+def findall(regex: str, text: str) -> list[str]:
+    return Searcher(regex).findall(text)
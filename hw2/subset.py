@@ -1,64 +1,179 @@
-from itertools import count
-from collections import deque
-from automata import NFA, DFA, LAMBDA
-
-__all__ = ["nfa_to_dfa"]
-
-def _lambda_closure(nfa: NFA, states: set[str]) -> set[str]:
-    closure = set(states)
-    stack = list(states)
-    while stack:
-        st = stack.pop()
-        if st in nfa.transition and LAMBDA in nfa.transition[st]:
-            for nxt in nfa.transition[st][LAMBDA]:
-                if nxt not in closure:
-                    closure.add(nxt)
-                    stack.append(nxt)
-    return closure
-
-
-def _move(nfa: NFA, state_set: set[str], symbol: str) -> set[str]:
-    out: set[str] = set()
-    for st in state_set:
-        if st in nfa.transition and symbol in nfa.transition[st]:
-            out.update(nfa.transition[st][symbol])
-    return out
-
-def nfa_to_dfa(nfa: NFA) -> DFA:
+import time
+from concurrent.futures import ProcessPoolExecutor
+from automata import NFA, DFA, LAMBDA, CompiledNFA
+from charclass import CharClass, symbol_classes
+import instrument
+
+__all__ = ["nfa_to_dfa", "subset_construction", "BudgetExceeded"]
+
+class BudgetExceeded(RuntimeError):
+    """
+    Raised when subset construction goes over max_states or max_seconds. stats holds what was
+    done until then: states discovered, subsets still waiting, transitions and seconds.
+    """
+    def __init__(self, reason: str, stats: dict):
+        super().__init__(f"Subset construction stopped after {stats['states']} states: {reason}.")
+        self.reason = reason
+        self.stats = stats
+
+def _by_class(nfa: NFA) -> NFA:
+    """
+    The same NFA with every CharClass label replaced by the symbol classes it covers: disjoint sets of
+    characters that every label either fully contains or avoids. Subsets and Hopcroft then work
+    per class, and the DFA gets one transition per class instead of one per character.
+    """
+    labels = {symbol for symbol in nfa.alphabet if symbol != LAMBDA}
+    if not any(isinstance(label, CharClass) for label in labels):
+        return nfa
+    classes, cover = symbol_classes(labels)
+    transitions: dict[str, dict] = {}
+    for state, row in nfa.transition.items():
+        new_row = transitions[state] = {}
+        for label, targets in row.items():
+            for symbol in ((LAMBDA,) if label == LAMBDA else cover[label]):
+                new_row.setdefault(symbol, set()).update(targets)
+    classified = NFA(nfa.states, set(classes), transitions, nfa.initial_state, nfa.final_states)
+    classified._closure_masks = nfa.lambda_closure_masks() # the λ-transitions did not change
+    return classified
+
+def nfa_to_dfa(nfa: NFA, max_states: int | None = None, max_seconds: float | None = None,
+               progress=None, workers: int = 0) -> DFA:
     """
     Convert λ-NFA to DFA with subset construction.
+
+    Subsets are bitmasks over the CompiledNFA of the NFA, whose steps already include the λ-closures,
+    and every subset is interned once in a dict from mask to DFA state number. The DFA states are
+    numbered in BFS order, so the list of subsets is the worklist as well.
+    Over max_states DFA states or max_seconds it raises BudgetExceeded. progress, if given, is
+    called with (states discovered, subsets waiting) after every block of expanded states and at the end.
+
+    With workers > 0 the successors of large BFS frontiers are computed in a process pool, see _determinise.
     """
+    return _determinise(nfa, max_states, max_seconds, progress, workers)[0]
 
-    dfa_alphabet = set(a for a in nfa.alphabet if a != LAMBDA)
+# states expanded between two budget/progress checks when running in this process
+BLOCK_SIZE = 1024
+# smaller frontiers are not worth sending to the pool
+MIN_PARALLEL_FRONTIER = 512
+
+# the (sources, successors) of every symbol, only in the worker processes of the pool,
+# set once by their initializer so the chunks do not carry them
+_entries: list[tuple[int, list[int]]] = []
+
+def _load_entries(entries: list[tuple[int, list[int]]]) -> None:
+    global _entries
+    _entries = entries
+
+def _expand_loaded(subsets: list[int]) -> list[list[tuple[int, int]]]:
+    return _expand(_entries, subsets)
 
-    name_of: dict[frozenset[str], str] = {}
-    counter = count()
-    def _name(S: frozenset[str]) -> str:
-        if S not in name_of:
-            name_of[S] = f"q{next(counter)}"
-        return name_of[S]
-
-    start_set = frozenset(_lambda_closure(nfa, {nfa.initial_state}))
-    worklist = deque([start_set])
-
-    dfa_trans: dict[str, dict[str, str]] = {}
-    dfa_states: set[str] = set()
-    dfa_finals: set[str] = set()
-
-    while worklist:
-        T = worklist.popleft()
-        T_name = _name(T)
-        dfa_states.add(T_name)
-        if T & nfa.final_states:
-            dfa_finals.add(T_name)
-
-        for sym in dfa_alphabet:
-            U = frozenset(_lambda_closure(nfa, _move(nfa, T, sym)))
-            if not U:
+def _expand(entries: list[tuple[int, list[int]]], subsets: list[int]) -> list[list[tuple[int, int]]]:
+    """
+    The (symbol number, successor subset) pairs of every subset.
+    """
+    rows = []
+    for subset in subsets:
+        row = []
+        for k, (sources, successors) in enumerate(entries):
+            active = subset & sources
+            if not active:
                 continue
-            U_name = _name(U)
-            dfa_trans.setdefault(T_name, {})[sym] = U_name
-            if U_name not in dfa_states:
-                worklist.append(U)
+            following = 0
+            while active:
+                lowest = active & -active
+                following |= successors[lowest.bit_length() - 1]
+                active ^= lowest
+            row.append((k, following))
+        rows.append(row)
+    return rows
+
+@instrument.stage("nfa_to_dfa")
+def _determinise(nfa: NFA, max_states: int | None, max_seconds: float | None, progress,
+                 workers: int = 0) -> tuple[DFA, list[int], CompiledNFA]:
+    """
+    The pending subsets are expanded a block at a time and the successors are interned in the
+    order of the block and of the symbols, which is exactly the order of a one-by-one BFS: the
+    numbering does not depend on how the blocks are cut. In parallel mode a block is the whole
+    frontier (the subsets waiting, i.e. the next BFS level), split into contiguous chunks for
+    the workers, which hold a copy of the symbol entries of the NFA. The results are merged
+    here, in order, so the DFA is identical to the sequential one, names included.
+    """
+    nfa = _by_class(nfa)
+    compiled = CompiledNFA(nfa)
+    dfa_alphabet = set(a for a in nfa.alphabet if a != LAMBDA)
+    # sorted, so the numbering does not depend on the iteration order of the alphabet set
+    symbols = [symbol for symbol in sorted(dfa_alphabet) if symbol in compiled.symbols]
+    entries = [compiled.symbols[symbol] for symbol in symbols]
+    final_mask = compiled.final_states
+
+    start = time.perf_counter()
+    subsets = [compiled.initial_state]
+    index = {compiled.initial_state: 0}
+    rows: list[list[tuple[str, int]]] = []
+    transitions = 0
 
-    return DFA(dfa_states, dfa_alphabet, dfa_trans, _name(start_set), dfa_finals)
+    def stats() -> dict:
+        return {
+            "states": len(subsets),
+            "pending": len(subsets) - len(rows),
+            "transitions": transitions,
+            "seconds": time.perf_counter() - start,
+        }
+
+    # the pool is only started by the first frontier large enough to use it
+    pool = None
+    try:
+        while len(rows) < len(subsets):
+            frontier = len(subsets) - len(rows)
+            if workers > 0 and frontier >= MIN_PARALLEL_FRONTIER:
+                if pool is None:
+                    pool = ProcessPoolExecutor(max_workers=workers, initializer=_load_entries, initargs=(entries,))
+                block = subsets[len(rows):]
+                size = -(-len(block) // (4 * workers)) # a few chunks per worker, for balance
+                chunks = [block[i:i + size] for i in range(0, len(block), size)]
+                expanded = [row for chunk_rows in pool.map(_expand_loaded, chunks) for row in chunk_rows]
+            else:
+                expanded = _expand(entries, subsets[len(rows):len(rows) + BLOCK_SIZE])
+
+            for successors in expanded:
+                row = []
+                for k, following in successors:
+                    number = index.get(following)
+                    if number is None:
+                        number = index[following] = len(subsets)
+                        subsets.append(following)
+                        if max_states is not None and len(subsets) > max_states:
+                            raise BudgetExceeded(f"more than {max_states} states", stats())
+                    row.append((symbols[k], number))
+                rows.append(row)
+                transitions += len(row)
+
+            if max_seconds is not None and time.perf_counter() - start > max_seconds:
+                raise BudgetExceeded(f"more than {max_seconds}s", stats())
+            if progress is not None:
+                progress(len(subsets), len(subsets) - len(rows))
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    instrument.count("subsets_interned", len(subsets))
+    instrument.count("dfa_transitions", transitions)
+    names = [f"q{i}" for i in range(len(subsets))]
+    dfa_trans = {names[i]: {symbol: names[j] for symbol, j in row} for i, row in enumerate(rows) if row}
+    dfa_finals = {names[i] for i, subset in enumerate(subsets) if subset & final_mask}
+    return DFA(set(names), dfa_alphabet, dfa_trans, names[0], dfa_finals), subsets, compiled
+
+def subset_construction(nfa: NFA) -> tuple[DFA, dict[str, frozenset[str]]]:
+    """
+    Same as nfa_to_dfa, but also returns the set of NFA states behind every DFA state.
+    """
+    dfa, subsets, compiled = _determinise(nfa, None, None, None)
+    members = {}
+    for i, subset in enumerate(subsets):
+        states = []
+        while subset:
+            lowest = subset & -subset
+            states.append(compiled.state_names[lowest.bit_length() - 1])
+            subset ^= lowest
+        members[f"q{i}"] = frozenset(states)
+    return dfa, members
@@ -0,0 +1,66 @@
+import itertools
+import random
+from automata import NFA, LAMBDA, scan_file, scan_file_lines
+from compiler import build
+
+def test_scanner():
+    dfa = build("(a|b)*abb")
+    for n in range(6):
+        for word in map("".join, itertools.product("abx", repeat=n)):
+            for split in range(n + 1):
+                scanner = dfa.scanner()
+                scanner.feed(word[:split])
+                scanner.feed(word[split:])
+                assert scanner.result() == dfa.accepts(word)
+
+def test_scanners_are_independent():
+    dfa = build("[a-z]+1")
+    first, second = dfa.scanner(), dfa.scanner()
+    first.feed("ab")
+    second.feed("1")
+    assert second.dead()
+    first.feed("c1")
+    assert first.result() and not second.result()
+
+def test_scan_file(tmp_path):
+    dfa = build("(ā|b)*ā")
+    path = tmp_path / "input.txt"
+    path.write_text("bā" * 100, encoding="utf-8")
+    # windows of 3 bytes cut the two-byte ā in half
+    assert scan_file(dfa, str(path), window=3) is True
+    path.write_text("ābāb\nā\n\nc\nbbā", encoding="utf-8")
+    assert list(scan_file_lines(dfa, str(path), window=3)) == [False, True, False, False, True]
+
+def _reachable(nfa: NFA, state: str) -> frozenset[str]:
+    seen, todo = {state}, [state]
+    while todo:
+        for following in nfa.transition.get(todo.pop(), {}).get(LAMBDA, ()):
+            if following not in seen:
+                seen.add(following)
+                todo.append(following)
+    return frozenset(seen)
+
+def test_lambda_closures():
+    rng = random.Random(0)
+    for _ in range(50):
+        states = [f"s{i}" for i in range(rng.randint(1, 12))]
+        transitions = {}
+        for state in states:
+            for _ in range(rng.randint(0, 3)):
+                transitions.setdefault(state, {}).setdefault(LAMBDA, set()).add(rng.choice(states))
+            transitions.setdefault(state, {})["a"] = {rng.choice(states)}
+        nfa = NFA(set(states), {"a", LAMBDA}, transitions, states[0], {states[-1]})
+        names, masks = nfa.lambda_closure_masks()
+        assert names == sorted(states)
+        for state, mask in zip(names, masks):
+            assert {names[i] for i in range(len(names)) if mask >> i & 1} == _reachable(nfa, state)
+        assert nfa.lambda_closures() == {state: _reachable(nfa, state) for state in states}
+
+def test_long_lambda_chain():
+    # a chain of 20000 λ-edges: every closure is a suffix of it
+    states = [f"s{i:05}" for i in range(20_000)]
+    transitions = {state: {LAMBDA: {following}} for state, following in zip(states, states[1:])}
+    nfa = NFA(set(states), {LAMBDA}, transitions, states[0], {states[-1]})
+    names, masks = nfa.lambda_closure_masks()
+    assert masks[0] == (1 << len(states)) - 1 and masks[-1] == 1 << (len(states) - 1)
+    assert nfa.compile().accepts("")
@@ -0,0 +1,63 @@
+import itertools
+import os
+import pytest
+import codegen
+from parser import to_postfix
+from thompson import postfix_to_nfa
+from subset import nfa_to_dfa
+from minimise import minimise_dfa
+
+def _dfa(regex: str):
+    return minimise_dfa(nfa_to_dfa(postfix_to_nfa(to_postfix(regex))))
+
+@pytest.fixture(autouse=True)
+def fresh(monkeypatch):
+    monkeypatch.setattr(codegen, "_loaded", {})
+
+@pytest.mark.parametrize("regex", ["(a|b)*abb", "a(b|c)*d?", "[a-z]+[0-9]", "(ab)*|c+", "[^x]y"])
+def test_matches_like_the_dfa(regex):
+    dfa = _dfa(regex)
+    match = codegen.matcher(dfa, directory=None)
+    for n in range(5):
+        for word in map("".join, itertools.product("abcdxy0z", repeat=n)):
+            assert match(word) == dfa.accepts(word), word
+
+def test_too_many_states():
+    with pytest.raises(ValueError):
+        codegen.generate(_dfa("(a|b)*a(a|b)(a|b)(a|b)(a|b)(a|b)(a|b)(a|b)(a|b)"))
+
+def test_key_is_the_table(monkeypatch):
+    first = codegen.matcher(_dfa("(a|b)*abb"), directory=None)
+    # the same language built again is a hit, and nothing is generated
+    monkeypatch.setattr(codegen, "_source", None)
+    assert codegen.matcher(_dfa("(a|b)*abb"), directory=None) is first
+
+def test_disk_cache(tmp_path, monkeypatch):
+    directory = str(tmp_path / "codegen")
+    codegen.matcher(_dfa("ab*c"), directory=directory)
+    assert oct(os.stat(directory).st_mode & 0o777) == oct(0o700)
+    [name] = [name for name in os.listdir(directory) if name.endswith(".py")]
+    # another process imports the saved module
+    monkeypatch.setattr(codegen, "_loaded", {})
+    monkeypatch.setattr(codegen, "_source", None)
+    match = codegen.matcher(_dfa("ab*c"), directory=directory)
+    assert match.__module__ == name[:-3]
+    assert match("abbc") and not match("abcc")
+
+def test_untrusted_files_are_not_imported(tmp_path):
+    directory = tmp_path / "codegen"
+    codegen.matcher(_dfa("ab*c"), directory=str(directory))
+    [name] = [name for name in os.listdir(directory) if name.endswith(".py")]
+    path = directory / name
+    path.write_text("def match(string):\n    return True\n")
+    os.chmod(path, 0o666)
+    codegen._loaded.clear()
+    match = codegen.matcher(_dfa("ab*c"), directory=str(directory))
+    assert match("ac") and not match("x")
+
+def test_shared_directory_is_not_used(tmp_path):
+    directory = tmp_path / "shared"
+    directory.mkdir()
+    os.chmod(directory, 0o777)
+    assert codegen.matcher(_dfa("ab"), directory=str(directory))("ab")
+    assert os.listdir(directory) == []
@@ -0,0 +1,70 @@
+import os
+import pickle
+import compiler
+from compiler import RegexCache
+
+def _files(directory) -> list[str]:
+    return [name for name in os.listdir(directory) if name.endswith(".pickle")]
+
+def test_memory_lru():
+    cache = RegexCache(maxsize=2, directory=None)
+    first = cache.compile("a*")
+    assert cache.compile("a*") is first
+    cache.compile("b*")
+    cache.compile("c*") # evicts a*, the least recently used
+    assert cache.info() == {"hits": 1, "disk_hits": 0, "misses": 3, "evictions": 1, "size": 2, "maxsize": 2}
+    assert cache.compile("a*") is not first
+
+def test_disk_reuse(tmp_path):
+    directory = str(tmp_path / "cache")
+    RegexCache(directory=directory).compile("(a|b)*abb")
+    assert oct(os.stat(directory).st_mode & 0o777) == oct(0o700)
+    cache = RegexCache(directory=directory)
+    dfa = cache.compile("(a|b)*abb")
+    assert cache.info()["disk_hits"] == 1 and cache.info()["misses"] == 0
+    assert dfa.accepts("aabb") and not dfa.accepts("abba")
+    # another construction is another entry
+    cache.compile("(a|b)*abb", "glushkov")
+    assert cache.info()["misses"] == 1
+
+def test_disk_eviction(tmp_path):
+    cache = RegexCache(maxsize=1, directory=str(tmp_path), max_disk_entries=10)
+    for i in range(11):
+        cache.compile("a" * (i + 1))
+    assert len(_files(tmp_path)) == 9
+    assert cache.info()["evictions"] >= 2
+    for i in range(5):
+        cache.compile("b" * (i + 1))
+    assert len(_files(tmp_path)) <= 10
+
+def test_pipeline_version(tmp_path, monkeypatch):
+    RegexCache(directory=str(tmp_path)).compile("ab*")
+    monkeypatch.setattr(compiler, "PIPELINE_VERSION", compiler.PIPELINE_VERSION + 1)
+    cache = RegexCache(directory=str(tmp_path))
+    cache.compile("ab*")
+    assert cache.info()["disk_hits"] == 0 and cache.info()["misses"] == 1
+
+def test_unreadable_files_are_misses(tmp_path):
+    RegexCache(directory=str(tmp_path)).compile("ab*")
+    for content in [b"not a pickle", pickle.dumps(("something", "else"))]:
+        for name in _files(tmp_path):
+            with open(tmp_path / name, "wb") as f:
+                f.write(content)
+        cache = RegexCache(directory=str(tmp_path))
+        assert cache.compile("ab*").accepts("abb")
+        assert cache.info()["misses"] == 1
+
+def test_shared_directory_is_not_used(tmp_path):
+    directory = tmp_path / "shared"
+    directory.mkdir()
+    os.chmod(directory, 0o777)
+    cache = RegexCache(directory=str(directory))
+    assert cache.compile("ab*").accepts("ab")
+    assert _files(directory) == []
+
+def test_compile_regex(tmp_path, monkeypatch):
+    # the default cache would write into the real cache directory
+    monkeypatch.setattr(compiler, "_default", RegexCache(directory=str(tmp_path)))
+    assert compiler.compile_regex("(ab)+").accepts("abab")
+    assert compiler.cache_info()["misses"] == 1
+    assert len(_files(tmp_path)) == 1
@@ -0,0 +1,12 @@
+from compiler import build
+from derivatives import DerivativeDFA
+from parser import to_postfix
+
+def test_long_nullable_sequences():
+    # deep right-nested concatenations used to exceed the recursion limit
+    dfa = build("a*" * 1000, "derivatives")
+    assert dfa.accepts("") and dfa.accepts("a" * 50)
+    derivatives = DerivativeDFA(to_postfix("a?" * 1200))
+    assert derivatives.accepts("")
+    assert derivatives.accepts("a" * 30)
+    assert not derivatives.accepts("b")
@@ -0,0 +1,79 @@
+import io
+import os
+import re
+import shutil
+import stat
+import pytest
+import dot
+from parser import to_postfix
+from thompson import postfix_to_nfa
+from subset import nfa_to_dfa
+from minimise import minimise_dfa
+
+def _dfa(regex: str):
+    return nfa_to_dfa(postfix_to_nfa(to_postfix(regex)))
+
+def _source(automaton, **kwargs) -> str:
+    out = io.StringIO()
+    dot.write_dot(automaton, out, **kwargs)
+    return out.getvalue()
+
+def _check(source: str) -> None:
+    # balanced braces, every statement on its own line, every quoted name closed
+    lines = source.splitlines()
+    assert lines[0].startswith("digraph ") and lines[0].endswith("{") and lines[-1] == "}"
+    for line in lines[1:-1]:
+        assert line.startswith("\t") and "{" not in line and "}" not in line
+        assert len(re.findall(r'(?<!\\)"', line)) % 2 == 0
+
+def test_whole_automaton():
+    dfa = _dfa("(a|b)*abb")
+    source = _source(dfa, name='say "hi"')
+    _check(source)
+    assert source.startswith('digraph "say \\"hi\\"" {')
+    for state in dfa.states:
+        shape = "doublecircle" if state in dfa.final_states else "circle"
+        assert f'\t"{state}" [shape={shape}]\n' in source
+    assert "__more" not in source
+    # both symbols of a loop end up on one edge
+    assert '"q0" -> "q0" [label="a,b"]' in _source(minimise_dfa(_dfa("(a|b)*")))
+
+def test_nfa():
+    nfa = postfix_to_nfa(to_postfix("a|b"))
+    source = _source(nfa)
+    _check(source)
+    assert source.count(" -> ") == 1 + sum(len(targets) for row in nfa.transition.values()
+                                           for targets in row.values())
+
+def test_max_states():
+    dfa = _dfa("(a|b)*a(a|b)(a|b)(a|b)(a|b)")
+    source = _source(dfa, max_states=5)
+    _check(source)
+    shown = dot.sample_states(dfa, 5)
+    assert len(shown) == 5 and shown[0] == dfa.initial_state
+    assert len(re.findall(r"\[shape=(?:double)?circle\]", source)) == 5
+    assert f'"__more" [label="{len(dfa.states) - 5} more states" shape=plaintext]' in source
+    for src, dst in re.findall(r'\t"([^"]+)" -> "([^"]+)"', source):
+        assert src in shown + ["__start"] and dst in shown + ["__more"]
+
+def test_render_without_graphviz(tmp_path, monkeypatch):
+    monkeypatch.setattr(shutil, "which", lambda name: None)
+    with pytest.raises(RuntimeError, match="Graphviz dot not installed."):
+        dot.render(_dfa("ab"), str(tmp_path / "ab"))
+    assert os.listdir(tmp_path) == []
+
+def test_renderer(tmp_path, monkeypatch):
+    # a stand-in for dot that copies its input to the -o file
+    program = tmp_path / "dot"
+    program.write_text('#!/bin/sh\ncp "$2" "$4"\n')
+    program.chmod(program.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setattr(shutil, "which", lambda name: str(program))
+    with dot.Renderer(workers=2) as renderer:
+        futures = [renderer.submit(_dfa(regex), str(tmp_path / "out" / str(i)), format="svg")
+                   for i, regex in enumerate(["ab", "a*", "(a|b)*abb"])]
+    for i, future in enumerate(futures):
+        image = future.result()
+        assert image == str(tmp_path / "out" / f"{i}.svg")
+        with open(image) as f:
+            _check(f.read())
+    assert sorted(os.listdir(tmp_path / "out")) == ["0.svg", "1.svg", "2.svg"]
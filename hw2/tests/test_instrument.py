@@ -0,0 +1,45 @@
+import io
+import json
+import instrument
+from parser import to_postfix
+from thompson import postfix_to_nfa
+from subset import nfa_to_dfa
+from minimise import minimise_dfa
+
+STAGES = ["to_postfix", "postfix_to_nfa", "nfa_to_dfa", "minimise_dfa"]
+
+def _pipeline(regex: str):
+    return minimise_dfa(nfa_to_dfa(postfix_to_nfa(to_postfix(regex))))
+
+def test_each_stage_once():
+    out = io.StringIO()
+    with instrument.collect(memory=True, jsonl=out) as stats:
+        assert instrument.enabled()
+        dfa = _pipeline("(a|b)*abb")
+    assert not instrument.enabled()
+    assert sorted(stats.stages) == sorted(STAGES)
+    for record in stats.stages.values():
+        assert record["calls"] == 1 and record["seconds"] >= 0 and record["peak_bytes"] >= 0
+    assert stats.counters["minimal_states"] == len(dfa.states) == 4
+    assert stats.counters["subsets_interned"] >= 4
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert sorted(line["stage"] for line in lines[:-1]) == sorted(STAGES)
+    assert lines[-1] == {"summary": stats.to_dict()}
+
+def test_off_records_nothing():
+    with instrument.collect() as stats:
+        pass
+    # a run after the collection ended, with instrumentation off
+    _pipeline("(a|b)*abb")
+    instrument.count("closures", 5)
+    assert stats.stages == {} and stats.counters == {}
+    assert json.loads(stats.to_json()) == {"stages": {}, "counters": {}}
+
+def test_nested_collections():
+    with instrument.collect() as outer:
+        with instrument.collect() as inner:
+            _pipeline("ab")
+        _pipeline("ab")
+    assert inner.stages["to_postfix"]["calls"] == 1
+    assert outer.stages["to_postfix"]["calls"] == 1
+    assert all(record["peak_bytes"] is None for record in outer.stages.values())
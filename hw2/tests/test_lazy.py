@@ -0,0 +1,56 @@
+import random
+from lazy import LazyDFA
+from parser import to_postfix
+from thompson import postfix_to_nfa
+from subset import nfa_to_dfa
+
+def _nfa(regex: str):
+    return postfix_to_nfa(to_postfix(regex))
+
+def _words(rng, count: int, alphabet: str = "ab", longest: int = 12) -> list[str]:
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, longest))) for _ in range(count)]
+
+def test_without_limit():
+    nfa = _nfa("(a|b)*a(a|b)(a|b)(a|b)")
+    lazy = LazyDFA(nfa)
+    words = _words(random.Random(1), 500)
+    assert lazy.accepts_many(words) == [nfa.accepts(word) for word in words]
+    stats = lazy.stats()
+    assert stats["states"] == len(nfa_to_dfa(nfa).states)
+    assert stats["flushes"] == 0 and stats["fallbacks"] == 0
+    # a miss per transition found, every subset having one on a and one on b
+    assert stats["misses"] <= 2 * stats["states"]
+    assert stats["hits"] + stats["misses"] == sum(map(len, words)) and stats["simulated"] == 0
+
+def test_flush_and_fallback():
+    nfa = _nfa("(a|b)*a" + "(a|b)" * 8) # 512 subsets
+    lazy = LazyDFA(nfa, max_states=50, min_hit_ratio=0.5)
+    words = _words(random.Random(2), 3000, longest=20)
+    assert lazy.accepts_many(words) == [nfa.accepts(word) for word in words]
+    stats = lazy.stats()
+    assert stats["states"] <= 50
+    assert stats["flushes"] > 0 and stats["fallbacks"] > 0 and stats["simulated"] > 0
+    assert stats["hits"] + stats["misses"] + stats["simulated"] == sum(map(len, words))
+
+def test_recovers_after_a_phase_change():
+    nfa = _nfa("((a|b)*a(a|b)(a|b)(a|b)(a|b)(a|b)(a|b)(a|b))|(c*d)")
+    lazy = LazyDFA(nfa, max_states=100)
+    rng = random.Random(3)
+    phase_1 = _words(rng, 2000, longest=30)
+    assert lazy.accepts_many(phase_1) == [nfa.accepts(word) for word in phase_1]
+    before = lazy.stats()
+    assert lazy.accepts_many(["cccccd"] * 20000) == [True] * 20000
+    after = lazy.stats()
+    # the second working set fits in the cache: it is flushed once for it and then only hit
+    assert after["flushes"] > before["flushes"]
+    assert after["fallbacks"] - before["fallbacks"] < 1000
+    assert after["hits"] - before["hits"] > 100_000
+
+def test_classes_bound_the_transitions():
+    nfa = _nfa("a[^a]*a")
+    lazy = LazyDFA(nfa)
+    text = "a" + "".join(map(chr, range(0x100, 0x2100))) + "a"
+    assert lazy.accepts(text) and not lazy.accepts(text[:-1])
+    assert lazy.stats()["misses"] <= 6
+    assert max(len(state.next) for state in lazy._cache.values()) <= 2
+    assert not lazy.accepts("b")
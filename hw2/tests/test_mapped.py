@@ -0,0 +1,59 @@
+import struct
+import sys
+from array import array
+import pytest
+import automata
+from automata import load_dfa
+from compiler import build
+
+WORDS = ["", "a", "ab", "aab", "ba", "abab", "x", "aāb", "bbbbba"]
+
+def _saved(tmp_path, regex: str):
+    dfa = build(regex)
+    path = str(tmp_path / "dfa.bin")
+    dfa.save(path)
+    return dfa, path
+
+@pytest.mark.parametrize("regex", ["(a|b)*a(a|b)", "[a-zā]+b", "\\W|a*"])
+def test_round_trip(tmp_path, regex):
+    dfa, path = _saved(tmp_path, regex)
+    with load_dfa(path) as mapped:
+        assert [mapped.accepts(word) for word in WORDS] == [dfa.accepts(word) for word in WORDS]
+
+def test_big_endian(tmp_path, monkeypatch):
+    # on a big-endian host save swaps the table to little-endian and the loader swaps it back
+    monkeypatch.setattr(sys, "byteorder", "big" if sys.byteorder == "little" else "little")
+    dfa, path = _saved(tmp_path, "[a-zā]+b")
+    with load_dfa(path) as mapped:
+        if sys.byteorder == "big":
+            assert isinstance(mapped.table, array)
+        assert list(mapped.table) == list(dfa.compile().table)
+        assert [mapped.accepts(word) for word in WORDS] == [dfa.accepts(word) for word in WORDS]
+
+def test_batch(tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    built = []
+    lookup_table = automata._lookup_table
+    monkeypatch.setattr(automata, "_lookup_table", lambda *args: built.append(args) or lookup_table(*args))
+    dfa, path = _saved(tmp_path, "(a|b)*a(a|b)")
+    with load_dfa(path) as mapped:
+        for _ in range(3):
+            assert mapped.accepts_batch(WORDS).tolist() == [dfa.accepts(word) for word in WORDS]
+    # the code point table is built by the first batch and kept with the batch table
+    assert len(built) == 1
+
+def test_bad_files(tmp_path):
+    _, path = _saved(tmp_path, "(a|b)*a(a|b)")
+    with open(path, "rb") as f:
+        content = f.read()
+    bad = str(tmp_path / "bad.bin")
+    version = struct.pack("<I", 99)
+    for data, message in [(b"LFA", "not a DFA file"),
+                          (b"NOPE" + content[4:], "not a DFA file"),
+                          (content[:4] + version + content[8:], "version"),
+                          (content[:-1], "truncated"),
+                          (content + b"\0", "truncated")]:
+        with open(bad, "wb") as f:
+            f.write(data)
+        with pytest.raises(ValueError, match=message):
+            load_dfa(bad)
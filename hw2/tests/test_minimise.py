@@ -0,0 +1,62 @@
+import itertools
+import pytest
+from automata import DFA
+from minimise import minimise_dfa
+from parser import to_postfix
+from thompson import postfix_to_nfa
+from subset import nfa_to_dfa
+
+def _words(alphabet, longest: int = 6):
+    for n in range(longest + 1):
+        yield from map("".join, itertools.product(sorted(alphabet), repeat=n))
+
+def _check(dfa: DFA, size: int) -> DFA:
+    minimal = minimise_dfa(dfa)
+    assert len(minimal.states) == size
+    # states named q0.. in order, the initial state first
+    assert minimal.initial_state == "q0"
+    assert minimal.states == {f"q{i}" for i in range(size)}
+    assert set(minimal.transition) <= minimal.states and minimal.final_states <= minimal.states
+    for word in _words(dfa.alphabet):
+        assert minimal.accepts(word) == dfa.accepts(word), word
+    return minimal
+
+def test_partial_transitions():
+    # ab, with no transition at all where the word cannot go on
+    dfa = DFA({"s", "t", "u"}, {"a", "b"}, {"s": {"a": "t"}, "t": {"b": "u"}}, "s", {"u"})
+    minimal = _check(dfa, 3)
+    # the sink added for the missing transitions is not in the result
+    assert sum(len(row) for row in minimal.transition.values()) == 2
+
+def test_dead_states():
+    # x and y can never reach a final state, they go away with the sink
+    dfa = DFA({"s", "t", "x", "y"}, {"a", "b"},
+              {"s": {"a": "t", "b": "x"}, "t": {"a": "t", "b": "y"}, "x": {"a": "x", "b": "y"}, "y": {"a": "x"}},
+              "s", {"t"})
+    minimal = _check(dfa, 2)
+    assert minimal.transition == {"q0": {"a": "q1"}, "q1": {"a": "q1"}}
+
+def test_equivalent_states():
+    # (a|b)*b with two copies of every state
+    dfa = DFA({"p0", "p1", "r0", "r1"}, {"a", "b"},
+              {"p0": {"a": "r0", "b": "p1"}, "p1": {"a": "r0", "b": "r1"},
+               "r0": {"a": "p0", "b": "r1"}, "r1": {"a": "p0", "b": "p1"}}, "p0", {"p1", "r1"})
+    _check(dfa, 2)
+
+def test_all_final():
+    dfa = DFA({"s", "t"}, {"a", "b"}, {"s": {"a": "t", "b": "s"}, "t": {"a": "s", "b": "t"}}, "s", {"s", "t"})
+    assert _check(dfa, 1).transition == {"q0": {"a": "q0", "b": "q0"}}
+    # a* with b missing: the sink still tells the states apart from nothing
+    partial = DFA({"s", "t"}, {"a", "b"}, {"s": {"a": "t"}, "t": {"a": "s"}}, "s", {"s", "t"})
+    assert _check(partial, 1).transition == {"q0": {"a": "q0"}}
+
+def test_no_final():
+    dfa = DFA({"s", "t"}, {"a"}, {"s": {"a": "t"}, "t": {"a": "s"}}, "s", set())
+    minimal = _check(dfa, 1)
+    assert minimal.transition == {} and minimal.final_states == set()
+
+@pytest.mark.parametrize("n", range(6))
+def test_exponential_family(n):
+    # the last n + 1 symbols have to be remembered
+    dfa = nfa_to_dfa(postfix_to_nfa(to_postfix("(a|b)*a" + "(a|b)" * n)))
+    _check(dfa, 2 ** (n + 1))
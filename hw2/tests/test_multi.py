@@ -0,0 +1,32 @@
+import pytest
+from multi import MultiPattern
+
+def test_overlapping_patterns():
+    multi = MultiPattern(["a+", "ab*", "(a|b)*b", "c"])
+    assert multi.match("a") == {0, 1}
+    assert multi.match("abb") == {1, 2}
+    assert multi.match("bab") == {2}
+    assert multi.match("aa") == {0}
+    assert multi.match("c") == {3}
+    assert multi.match("") == frozenset()
+    assert multi.match("x") == frozenset()
+    assert multi.match_many(["a", "ca"]) == [{0, 1}, frozenset()]
+
+def test_lowest_id_wins_ties():
+    keywords = MultiPattern(["if", "[a-z]+", " "])
+    assert list(keywords.tokenize("if iff")) == [(0, "if"), (2, " "), (1, "iff")]
+    # the same patterns in the other order give the keyword to the identifiers
+    identifiers = MultiPattern(["[a-z]+", "if", " "])
+    assert list(identifiers.tokenize("if iff")) == [(0, "if"), (2, " "), (0, "iff")]
+
+def test_maximal_munch():
+    multi = MultiPattern(["a", "aab", "a*"])
+    assert list(multi.tokenize("aabaa")) == [(1, "aab"), (2, "aa")]
+    # a single a is matched by a and a*, the lowest id wins
+    assert list(multi.tokenize("aaba")) == [(1, "aab"), (0, "a")]
+
+@pytest.mark.parametrize("text, position", [("ab?a", 2), ("?", 0), ("abab!", 4)])
+def test_no_match(text, position):
+    multi = MultiPattern(["ab", "a", "b"])
+    with pytest.raises(ValueError, match=f"^No pattern matches at position {position}.$"):
+        list(multi.tokenize(text))
@@ -0,0 +1,34 @@
+import json
+import run_tests
+
+def _boom(string):
+    raise IndexError("out of range")
+
+def test_matcher_errors_are_failures(monkeypatch):
+    monkeypatch.setattr(run_tests, "_compiled", {})
+    monkeypatch.setattr(run_tests, "build_matchers", lambda regex, names: {"ok": lambda s: s == "a", "boom": _boom})
+    case = {"name": "R", "regex": "a", "test_strings": [{"input": "a", "expected": True},
+                                                      {"input": "b", "expected": False}]}
+    result = run_tests.run_case(case)
+    assert result["error"] is None
+    assert result["failures"] == [
+        {"matcher": "boom", "input": "a", "expected": True, "got": "IndexError: out of range"},
+        {"matcher": "boom", "input": "b", "expected": False, "got": "IndexError: out of range"},
+    ]
+
+def test_run_all_in_process(tmp_path):
+    path = tmp_path / "cases.json"
+    cases = [{"name": f"R{i}", "regex": regex, "test_strings": [{"input": "ab", "expected": regex != "b"}]}
+             for i, regex in enumerate(["ab", "a*b", "b"])]
+    path.write_text(json.dumps(cases))
+    results = run_tests.run_all(str(path), workers=0)
+    assert [result["name"] for result in results] == ["R0", "R1", "R2"]
+    assert all(not result["failures"] and result["error"] is None for result in results)
+
+def test_matchers_option():
+    assert list(run_tests.build_matchers("(a|b)*abb")) == ["dfa", "min"]
+    matchers = run_tests.build_matchers("(a|b)*abb", tuple(run_tests.MATCHERS))
+    assert list(matchers) == list(run_tests.MATCHERS)
+    assert all(accepts("babb") and not accepts("abba") for accepts in matchers.values())
+    # codegen is skipped past its size limit
+    assert "codegen" not in run_tests.build_matchers("(a|b)*a" + "(a|b)" * 8, ("min", "codegen"))
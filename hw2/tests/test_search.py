@@ -0,0 +1,53 @@
+import random
+from compiler import build
+from search import Searcher, search, findall
+
+REGEXES = ["a", "ab|a", "a|a(a|b)*c", "(a|b)*c", "a*", "b?a+", "(ab|ba)*", "[a-c]+d", "\\w+@\\w+", "(a|b)(a|b)c?"]
+
+def _brute_force(regex: str, text: str) -> list[tuple[int, int]]:
+    # leftmost-longest by trying every substring with the whole-word matcher
+    dfa = build(regex)
+    spans, position = [], 0
+    while position <= len(text):
+        for start in range(position, len(text) + 1):
+            ends = [end for end in range(start, len(text) + 1) if dfa.accepts(text[start:end])]
+            if ends:
+                break
+        else:
+            return spans
+        spans.append((start, ends[-1]))
+        position = ends[-1] if ends[-1] > start else ends[-1] + 1
+    return spans
+
+def test_finditer_against_brute_force():
+    rng = random.Random(0)
+    for regex in REGEXES:
+        searcher = Searcher(regex)
+        for _ in range(40):
+            text = "".join(rng.choice("abcd@x ") for _ in range(rng.randint(0, 14)))
+            expected = _brute_force(regex, text)
+            assert [match.span() for match in searcher.finditer(text)] == expected, (regex, text)
+            first = searcher.search(text)
+            assert (first.span() if first else None) == (expected[0] if expected else None)
+
+def test_module_functions():
+    assert search("b+", "aabbba").span() == (2, 5)
+    assert search("c", "aab") is None
+    assert findall("[0-9]+", "a1b22c333") == ["1", "22", "333"]
+
+class _Counted(str):
+    # a text counting the characters read from it, one per DFA step
+    reads = 0
+
+    def __getitem__(self, key):
+        type(self).reads += 1
+        return str.__getitem__(self, key)
+
+def test_linear_on_overlapping_candidates():
+    searcher = Searcher("a|a(a|b)*c")
+    for n in [1000, 4000]:
+        _Counted.reads = 0
+        assert len(searcher.findall(_Counted("a" * n))) == n
+        # a backward step per character, a scan stopping one step after its match and the slice
+        # of the match: a few reads per character, where the quadratic version read about n * n / 2
+        assert _Counted.reads <= 5 * n
@@ -0,0 +1,67 @@
+import sys
+import threading
+import pytest
+import subset
+from parser import to_postfix
+from thompson import postfix_to_nfa
+from subset import nfa_to_dfa, BudgetExceeded
+
+def _nfa(regex: str):
+    return postfix_to_nfa(to_postfix(regex))
+
+def test_threads_do_not_share_state():
+    regexes = ["(a|b)*a" + "(a|b)" * 11, "(c|d|e)*c" + "(c|d|e)" * 6]
+    nfas = [_nfa(regex) for regex in regexes]
+    expected = [nfa_to_dfa(nfa) for nfa in nfas]
+    wrong = []
+    barrier = threading.Barrier(2)
+
+    def run(i):
+        barrier.wait()
+        for _ in range(5):
+            dfa = nfa_to_dfa(nfas[i])
+            if dfa.transition != expected[i].transition or dfa.final_states != expected[i].final_states:
+                wrong.append(regexes[i])
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6) # switch threads often, so the two constructions interleave
+    try:
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert wrong == []
+
+def test_parallel_matches_sequential(monkeypatch):
+    monkeypatch.setattr(subset, "MIN_PARALLEL_FRONTIER", 8)
+    nfa = _nfa("(a|b)*a(a|b)(a|b)(a|b)(a|b)(a|b)")
+    sequential = nfa_to_dfa(nfa)
+    parallel = nfa_to_dfa(nfa, workers=2)
+    assert parallel.transition == sequential.transition
+    assert parallel.final_states == sequential.final_states
+
+def test_no_pool_for_small_frontiers(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("pool started")
+    monkeypatch.setattr(subset, "ProcessPoolExecutor", fail)
+    assert nfa_to_dfa(_nfa("(a|b)*abb"), workers=4).accepts("aabb")
+
+def test_budget_exceeded():
+    nfa = _nfa("(a|b)*a" + "(a|b)" * 15) # 2^16 DFA states
+    with pytest.raises(BudgetExceeded) as caught:
+        nfa_to_dfa(nfa, max_states=500)
+    assert caught.value.reason == "more than 500 states"
+    assert caught.value.stats["states"] == 501
+    assert str(caught.value).startswith("Subset construction stopped after 501 states")
+
+def test_progress(monkeypatch):
+    monkeypatch.setattr(subset, "BLOCK_SIZE", 16)
+    calls = []
+    dfa = nfa_to_dfa(_nfa("(a|b)*a" + "(a|b)" * 7), progress=lambda states, pending: calls.append((states, pending)))
+    assert len(calls) > 2
+    counts = [states for states, _ in calls]
+    assert counts == sorted(counts) and counts[-1] == len(dfa.states)
+    assert calls[-1][1] == 0
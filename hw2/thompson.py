@@ -1,85 +1,94 @@
-import itertools
-import copy
 from automata import NFA, LAMBDA
+import instrument
 
 __all__ = ["postfix_to_nfa"]
 
-# adds new states keeping count of how many states there are already
-def _new_state(counter: itertools.count) -> str:
-    return f"q{next(counter)}"
-
-def _merge_trans(dst: dict, src: dict) -> dict:
+class _Arena:
     """
-    This combines two transition functions: it adds the transitions from src to dst by creating a new state key,
-    if it doesn't exist or, if it exists, by appending the transitions associated to it from src
+    Append-only storage shared by all the fragments of one construction. States are integer
+    ids and a fragment is just its (start, accept) pair, so combining fragments only adds a
+    few edges instead of copying transition maps: the build is linear in the regex length.
     """
-    out = copy.deepcopy(dst)
-    for state, trans in src.items():
-        st_dict = out.setdefault(state, {}) # if state doesn't already exist in the dst transition, create an empty set of transitions
-        for sym, targets in trans.items():
-            st_dict.setdefault(sym, set()).update(targets) # add the transitions from src
-    return out
+    def __init__(self):
+        self.edges: list[list[tuple[str, int]]] = [] # outgoing (symbol, target) of every state
+
+    def new_state(self) -> int:
+        self.edges.append([])
+        return len(self.edges) - 1
+
+    def add_edge(self, src: int, symbol: str, dst: int) -> None:
+        self.edges[src].append((symbol, dst))
 
+    def to_nfa(self, start: int, accept: int, alphabet: set[str]) -> NFA:
+        # the state names only exist in the exported NFA
+        names = [f"q{i}" for i in range(len(self.edges))]
+        transitions: dict[str, dict[str, set[str]]] = {}
+        for src, edges in enumerate(self.edges):
+            for symbol, dst in edges:
+                transitions.setdefault(names[src], {}).setdefault(symbol, set()).add(names[dst])
+        return NFA(set(names), alphabet, transitions, names[start], {names[accept]})
+
+@instrument.stage("postfix_to_nfa")
 def postfix_to_nfa(tokens: list[str]) -> NFA:
     """
-    This uses Thompson's algorithm to turn a regex in postfix notation to an
+    This uses Thompson's algorithm to turn a regex in postfix notation to a λ-NFA.
     """
-    counter = itertools.count()
-    stack: list[tuple[str, str, dict]] = [] # stack of tuples (start_state, accept_state, transitions)
+    arena = _Arena()
+    stack: list[tuple[int, int]] = [] # stack of fragments (start_state, accept_state)
     alphabet: set[str] = set()
 
     for token in tokens:
         if token not in {'.', '|', '*', '+', '?'}:
-            s = _new_state(counter)
-            f = _new_state(counter)
-            transitions = {s: {token: {f}}}
+            s = arena.new_state()
+            f = arena.new_state()
+            arena.add_edge(s, token, f)
             alphabet.add(token)
-            stack.append((s, f, transitions))
+            stack.append((s, f))
             continue
 
         if token == '.':
-            s2, f2, t2 = stack.pop()
-            s1, f1, t1 = stack.pop()
-            merged = _merge_trans(t1, t2)
-            merged.setdefault(f1, {}).setdefault(LAMBDA, set()).add(s2)
-            stack.append((s1, f2, merged))
+            s2, f2 = stack.pop()
+            s1, f1 = stack.pop()
+            arena.add_edge(f1, LAMBDA, s2)
+            stack.append((s1, f2))
 
         elif token == '|':
-            s2, f2, t2 = stack.pop()
-            s1, f1, t1 = stack.pop()
-            s_new, f_new = _new_state(counter), _new_state(counter)
-            trans = _merge_trans(t1, t2)
-            trans.setdefault(s_new, {}).setdefault(LAMBDA, set()).update({s1, s2})
-            trans.setdefault(f1, {}).setdefault(LAMBDA, set()).add(f_new)
-            trans.setdefault(f2, {}).setdefault(LAMBDA, set()).add(f_new)
-            stack.append((s_new, f_new, trans))
+            s2, f2 = stack.pop()
+            s1, f1 = stack.pop()
+            s_new, f_new = arena.new_state(), arena.new_state()
+            arena.add_edge(s_new, LAMBDA, s1)
+            arena.add_edge(s_new, LAMBDA, s2)
+            arena.add_edge(f1, LAMBDA, f_new)
+            arena.add_edge(f2, LAMBDA, f_new)
+            stack.append((s_new, f_new))
 
         elif token == '*':
-            s_old, f_old, trans = stack.pop()
-            s_new, f_new = _new_state(counter), _new_state(counter)
-            trans.setdefault(s_new, {}).setdefault(LAMBDA, set()).update({s_old, f_new})
-            trans.setdefault(f_old, {}).setdefault(LAMBDA, set()).update({s_old, f_new})
-            stack.append((s_new, f_new, trans))
+            s_old, f_old = stack.pop()
+            s_new, f_new = arena.new_state(), arena.new_state()
+            arena.add_edge(s_new, LAMBDA, s_old)
+            arena.add_edge(s_new, LAMBDA, f_new)
+            arena.add_edge(f_old, LAMBDA, s_old)
+            arena.add_edge(f_old, LAMBDA, f_new)
+            stack.append((s_new, f_new))
 
         elif token == '+':
-            s_old, f_old, trans = stack.pop()
-            s_new, f_new = _new_state(counter), _new_state(counter)
-            trans.setdefault(s_new, {}).setdefault(LAMBDA, set()).add(s_old)
-            trans.setdefault(f_old, {}).setdefault(LAMBDA, set()).update({s_old, f_new})
-            stack.append((s_new, f_new, trans))
+            s_old, f_old = stack.pop()
+            s_new, f_new = arena.new_state(), arena.new_state()
+            arena.add_edge(s_new, LAMBDA, s_old)
+            arena.add_edge(f_old, LAMBDA, s_old)
+            arena.add_edge(f_old, LAMBDA, f_new)
+            stack.append((s_new, f_new))
 
         elif token == '?':
-            s_old, f_old, trans = stack.pop()
-            s_new, f_new = _new_state(counter), _new_state(counter)
-            trans.setdefault(s_new, {}).setdefault(LAMBDA, set()).update({s_old, f_new})
-            trans.setdefault(f_old, {}).setdefault(LAMBDA, set()).add(f_new)
-            stack.append((s_new, f_new, trans))
-
-    start, accept, transitions = stack.pop()
-
-    states: set[str] = set(transitions)
-    for adict in transitions.values():
-        for trg_set in adict.values():
-            states.update(trg_set)
+            s_old, f_old = stack.pop()
+            s_new, f_new = arena.new_state(), arena.new_state()
+            arena.add_edge(s_new, LAMBDA, s_old)
+            arena.add_edge(s_new, LAMBDA, f_new)
+            arena.add_edge(f_old, LAMBDA, f_new)
+            stack.append((s_new, f_new))
 
-    return NFA(states, alphabet, transitions, start, {accept})
+    start, accept = stack.pop()
+    if instrument.enabled():
+        instrument.count("nfa_states", len(arena.edges))
+        instrument.count("lambda_edges", sum(symbol == LAMBDA for edges in arena.edges for symbol, _ in edges))
+    return arena.to_nfa(start, accept, alphabet)